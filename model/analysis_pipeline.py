@@ -0,0 +1,303 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+import pandas as pd
+from profile_artifacts import load_profiles, expand_results
+from data_loader import DataLoader
+from calendar_alignment import DEFAULT_ALIGNMENT
+from ml_predictor import PortfolioPredictor
+from model_registry import ModelRegistry
+from batch_optimizer import optimize_portfolios_detailed
+
+PORTFOLIOS = {
+    "Bonos": ["^IRX", "^FVX", "^TNX", "^TYX"],
+    "ETFs": ["SPY", "QQQ", "VTI", "IVV", "XLV"],
+    "Acciones": ["MSFT", "GOOGL", "O", "PG", "ISRG", "MDT", "JPM"],
+    "Futuros": ["GC=F", "CL=F", "SI=F", "NQ=F", "ES=F"],
+    "Criptomonedas": ["BTC-USD", "ETH-USD", "BNB-USD", "TRX-USD", "DOGE-USD"]
+}
+
+# Asignación del capital entre portafolios para cada perfil de riesgo
+RISK_PROFILE_WEIGHTS = {
+    "Conservador": {"Bonos": 0.8, "ETFs": 0.2, "Acciones": 0, "Futuros": 0, "Criptomonedas": 0},
+    "Moderado": {"Bonos": 0.4, "ETFs": 0.4, "Acciones": 0.2, "Futuros": 0, "Criptomonedas": 0},
+    "Agresivo": {"Bonos": 0.1, "ETFs": 0.3, "Acciones": 0.5, "Futuros": 0.1, "Criptomonedas": 0},
+    "Muy Agresivo": {"Bonos": 0, "ETFs": 0, "Acciones": 0.6, "Futuros": 0.2, "Criptomonedas": 0.2}
+}
+
+HORIZONS = [3, 5, 10]
+
+# Carpeta de modelos que usa PortfolioPredictor
+MODELS_DIR = "models"
+
+
+def data_version(data_dir: str, assets: List[str]) -> str:
+    """Versión de los datos: hash del tamaño y la fecha de modificación de cada CSV."""
+    digest = hashlib.sha256()
+    for asset in sorted(assets):
+        path = os.path.join(data_dir, f"{asset}.csv")
+        try:
+            stat = os.stat(path)
+            digest.update(f"{asset}:{stat.st_size}:{stat.st_mtime_ns};".encode("utf-8"))
+        except FileNotFoundError:
+            digest.update(f"{asset}:-;".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def model_version(models_dir: str) -> str:
+    """
+    Versión del registro de modelos: hash del contenido de su manifiesto.
+
+    Solo cambia cuando se registra, reemplaza o compila un modelo; tocar o reescribir el
+    manifiesto con las mismas entradas no invalida los resultados.
+    """
+    try:
+        with open(os.path.join(models_dir, ModelRegistry.MANIFEST_FILE), "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()[:16]
+    except FileNotFoundError:
+        return "0"
+
+
+def allocation_key(portfolio_allocation: Dict[str, float]) -> Tuple:
+    """Clave de una asignación, independiente del orden y sin portafolios en 0."""
+    return tuple(sorted((name, round(float(weight), 6))
+                        for name, weight in portfolio_allocation.items() if weight > 0))
+
+
+class AnalysisResults(dict):
+    """Resultados por portafolio, con los avisos para mostrar al usuario en `warnings`."""
+
+    def __init__(self, results: Dict[str, Dict] = None, warnings: List[str] = None):
+        super().__init__(results or {})
+        self.warnings = list(warnings or [])
+
+
+def _summarize_predictions(predictions: Dict[int, pd.DataFrame], investment: float) -> Dict[int, Dict]:
+    """Valor inicial, final y retorno total de cada horizonte."""
+    summary = {}
+    for years, pred in predictions.items():
+        final_value = pred['Portfolio_Value'].iloc[-1]
+        summary[years] = {
+            'predictions': pred,
+            'initial_value': investment,  # Valor inicial del portafolio
+            'final_value': final_value,
+            'total_return': (final_value - investment) / investment * 100
+        }
+    return summary
+
+
+def compute_analysis(portfolio_data: Dict[str, pd.DataFrame], portfolio_allocation: Dict[str, float],
+                     investment_total: float = 100000,
+                     progress: Callable[[int, str], None] = None) -> AnalysisResults:
+    """
+    Optimiza cada portafolio seleccionado y proyecta su valor a 3, 5 y 10 años.
+
+    Args:
+        portfolio_data: Precios de cada portafolio.
+        portfolio_allocation: Fracción del capital en cada portafolio.
+        investment_total: Capital inicial.
+        progress: Función opcional progress(porcentaje, texto) para mostrar el avance.
+
+    Returns:
+        AnalysisResults: Por portafolio, 'returns', 'volatility', 'optimal_weights',
+                         'performance', 'frontier' y 'predictions'; en `warnings`, los
+                         portafolios seleccionados que no tienen datos.
+    """
+    progress = progress or (lambda percent, text: None)
+    progress(50, 'Preparando análisis de portafolio...')
+
+    # Todos los portafolios seleccionados en un solo lote. Corre en este proceso
+    # (max_workers=1): hacer fork del servidor de Streamlit, que usa hilos, no es seguro
+    # y cada portafolio se optimiza en milisegundos.
+    selected_data = {}
+    warnings = []
+    for portfolio_name, allocation in portfolio_allocation.items():
+        if allocation > 0 and portfolio_name in portfolio_data:
+            if portfolio_data[portfolio_name].empty:
+                warnings.append(f"No data available for {portfolio_name} portfolio")
+                continue
+            selected_data[portfolio_name] = portfolio_data[portfolio_name]
+    analysis = optimize_portfolios_detailed(selected_data, frontier_points=30, max_workers=1)
+
+    # Cada portafolio usa el modelo de sus propios retornos (el registro lo reutiliza si ya
+    # se entrenó), así su proyección no depende de qué otros portafolios se seleccionaron.
+    # Las trayectorias avanzan juntas, con una llamada a predict por modelo y día simulado.
+    predictors = {}
+    for portfolio_name in analysis:
+        predictor = PortfolioPredictor(portfolio_data[portfolio_name],
+                                       analysis[portfolio_name]['optimal_weights']['weights'])
+        predictor.train_or_load_model()
+        predictor.compile_model()
+        predictors[portfolio_name] = predictor
+    PortfolioPredictor.simulate_batch(list(predictors.values()), max(HORIZONS) * 252)
+
+    results = AnalysisResults(warnings=warnings)
+    for i, portfolio_name in enumerate(portfolio_allocation, 1):
+        progress(50 + i * 10, f'Analizando portafolio: {portfolio_name}...')
+        if portfolio_name not in analysis:
+            continue
+        investment = investment_total * portfolio_allocation[portfolio_name]
+        predictions = predictors[portfolio_name].predict_horizons(investment, HORIZONS)
+        results[portfolio_name] = {
+            **analysis[portfolio_name],
+            'predictions': _summarize_predictions(predictions, investment)
+        }
+    return results
+
+
+class AnalysisPipeline:
+    """
+    Capa de caché del análisis completo, compartida por todas las sesiones del proceso.
+
+    Guarda dos niveles:
+    - Datos: los precios de los portafolios por (rango de fechas, versión de los datos).
+    - Resultados: el análisis por (asignación, rango de fechas, versión de los datos,
+      versión del modelo, capital), con desalojo LRU a partir de max_results.
+
+    Las versiones se calculan con os.stat sobre los CSV y con el contenido del manifiesto
+    de modelos, así que una descarga nueva o un modelo nuevo invalidan la caché sin tener
+    que limpiarla.
+
+    El lock solo protege las búsquedas e inserciones en la caché. Las cargas y los cálculos
+    corren fuera de él, una sola vez por clave: las sesiones que piden la misma clave
+    mientras se calcula esperan ese resultado, y las que piden otras claves no esperan.
+
+    Si se indica artifact_path (ver profile_artifacts.py), las asignaciones precalculadas
+    se sirven desde ese archivo sin cargar datos ni modelos, mientras las versiones de los
+    datos y del modelo sean las del artefacto; las demás asignaciones, una petición que
+    descarga datos nuevos o un artefacto desactualizado se calculan en vivo.
+    """
+
+    def __init__(self, data_dir: str = "data", portfolios: Dict[str, List[str]] = None, max_results: int = 32,
+                 artifact_path: str = None, alignment: str = DEFAULT_ALIGNMENT):
+        self.data_dir = data_dir
+        # Política de calendario de DataLoader.process_portfolios (ver calendar_alignment.py)
+        self.alignment = alignment
+        self.artifact_path = artifact_path
+        self.portfolios = portfolios or PORTFOLIOS
+        self.max_results = max_results
+        self.assets = list(dict.fromkeys(asset for assets in self.portfolios.values() for asset in assets))
+        self._data = {}
+        self._results = OrderedDict()
+        self._pending: Dict[Tuple, Future] = {}  # Cálculos en curso, por clave
+        self._lock = threading.RLock()
+
+    def _compute_once(self, key: Tuple, compute: Callable[[], object]):
+        """Ejecuta compute una sola vez por clave aunque varias sesiones la pidan a la vez."""
+        with self._lock:
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            result = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._pending[key]
+
+    def load_portfolios(self, start_date: str, end_date: str, force_download: bool = False,
+                        incremental: bool = False) -> Tuple[Dict[str, pd.DataFrame], str]:
+        """Precios de cada portafolio y la versión de datos con que se cargaron."""
+        loader = None
+        if force_download or incremental:
+            loader = DataLoader(start_date=start_date, end_date=end_date, data_dir=self.data_dir,
+                                alignment=self.alignment)
+            loader.fetch_assets(self.assets, force_download=force_download, incremental=incremental)
+
+        version = data_version(self.data_dir, self.assets)
+        key = (start_date, end_date, version)
+        with self._lock:
+            if key in self._data:
+                return self._data[key], version
+
+        def load():
+            # Ya descargados: solo faltan los CSV que no existen
+            data_loader = loader or DataLoader(start_date=start_date, end_date=end_date, data_dir=self.data_dir,
+                                               alignment=self.alignment)
+            portfolio_data = data_loader.process_portfolios(self.portfolios)
+            # Si faltaba algún CSV se acaba de descargar y la versión cambió
+            loaded_version = data_version(self.data_dir, self.assets)
+            with self._lock:
+                # Solo se conserva la versión vigente de los datos
+                self._data = {(start_date, end_date, loaded_version): portfolio_data}
+            return portfolio_data, loaded_version
+
+        return self._compute_once(("data",) + key, load)
+
+    def run(self, portfolio_allocation: Dict[str, float], start_date: str = "2017-11-09",
+            end_date: str = "2024-10-31", investment_total: float = 100000, force_download: bool = False,
+            incremental: bool = False, progress: Callable[[int, str], None] = None) -> Dict[str, Dict]:
+        """Resultados del análisis para una asignación, desde la caché si ya se calcularon."""
+        progress = progress or (lambda percent, text: None)
+        if self.artifact_path and not (force_download or incremental):
+            precomputed = self._precomputed(portfolio_allocation, start_date, end_date, investment_total)
+            if precomputed is not None:
+                return precomputed
+
+        progress(30, 'Cargando datos históricos de mercado...')
+        portfolio_data, version = self.load_portfolios(start_date, end_date, force_download, incremental)
+        key = (allocation_key(portfolio_allocation), start_date, end_date, version,
+               model_version(MODELS_DIR), investment_total)
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+
+        def analyze():
+            results = compute_analysis(portfolio_data, portfolio_allocation, investment_total, progress)
+            # El primer análisis puede registrar un modelo nuevo: se guarda con la versión vigente
+            self._store(key[:4] + (model_version(MODELS_DIR), investment_total), results)
+            return results
+
+        return self._compute_once(("results",) + key, analyze)
+
+    def _store(self, key: Tuple, results: Dict[str, Dict]) -> None:
+        """Guarda un resultado en la caché, desalojando los menos usados."""
+        with self._lock:
+            self._results[key] = results
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+    def _precomputed(self, portfolio_allocation: Dict[str, float], start_date: str, end_date: str,
+                     investment_total: float) -> Optional[Dict[str, Dict]]:
+        """
+        Resultados del artefacto para esta asignación, o None si no fue precalculada o si
+        los datos o el modelo cambiaron desde que se generó el artefacto.
+        """
+        artifact = load_profiles(self.artifact_path)
+        if artifact is None or (artifact["start_date"], artifact["end_date"], artifact["investment_total"],
+                                artifact.get("alignment")) != (start_date, end_date, investment_total, self.alignment):
+            return None
+        if (artifact.get("data_version"), artifact.get("model_version")) != (
+                data_version(self.data_dir, self.assets), model_version(MODELS_DIR)):
+            print("El artefacto de perfiles no corresponde a los datos o al modelo actuales; se calcula en vivo")
+            return None
+        entry = artifact["by_allocation"].get(allocation_key(portfolio_allocation))
+        if entry is None:
+            return None
+        key = ("artifact", artifact["created"], allocation_key(portfolio_allocation))
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+        warnings = artifact.get("warnings", {}).get(allocation_key(portfolio_allocation))
+        results = AnalysisResults(expand_results(entry), warnings)
+        self._store(key, results)
+        return results
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._results.clear()
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+from typing import Dict
+from portfolio_analysis import max_sharpe_weights
+from rolling_stats import RollingStatistics
+from covariance_estimators import DenseCovariance, estimate_covariance
+from risk_free import get_average_risk_free_rate
+from risk_metrics import drawdowns, risk_report
+
+
+def walk_forward_backtest(prices: pd.DataFrame, lookback: int = 252, rebalance_every: int = 21,
+                          max_weight: float = 0.35, min_weight: float = 0.05, risk_free_rate: float = None,
+                          covariance: str = "sample", transaction_cost: float = 0.0) -> Dict:
+    """
+    Backtest fuera de muestra de los pesos de máximo Sharpe, reoptimizando con una ventana móvil.
+
+    En cada fecha de rebalanceo se estiman media y covarianza con los últimos `lookback`
+    días y se optimizan los pesos (igual que optimize_weights). Con covariance='sample' la
+    ventana se actualiza de forma incremental (RollingStatistics): entre dos rebalanceos
+    solo se suman los días nuevos y se restan los que salen. Entre rebalanceos los pesos
+    derivan con los precios, y los retornos de cada período se calculan en bloque.
+
+    Args:
+        prices: Precios de los activos.
+        lookback: Días de historia para cada optimización.
+        rebalance_every: Días entre rebalanceos.
+        max_weight: Peso máximo por activo.
+        min_weight: Peso mínimo por activo.
+        risk_free_rate: Tasa libre de riesgo anual; por defecto se obtiene de risk_free.py.
+        covariance: Estimador de covarianza (ver covariance_estimators.py).
+        transaction_cost: Costo por unidad de rotación, descontado el día del rebalanceo. La
+                          compra inicial cuenta como rotación 1 (todo el capital pasa de
+                          efectivo a los activos), así que el primer día paga el costo de
+                          entrada transaction_cost.
+
+    Returns:
+        Dict: 'returns' (Series diaria fuera de muestra), 'equity', 'drawdown', 'weights'
+              (DataFrame por fecha de rebalanceo), 'turnover' (Series, 1 en la compra
+              inicial), y los escalares 'annual_return', 'annual_volatility', 'sharpe_ratio',
+              'max_drawdown', y las métricas de cola 'var_95', 'cvar_95', 'sortino_ratio' y
+              'calmar_ratio'.
+    """
+    if risk_free_rate is None:
+        risk_free_rate = get_average_risk_free_rate()
+    returns = prices.pct_change().dropna()
+    values = returns.to_numpy(dtype=np.float64)
+    n_days, n_assets = values.shape
+    if n_days <= lookback:
+        raise ValueError(f"Se necesitan más de {lookback} días de retornos para el backtest.")
+
+    stats = RollingStatistics(lookback, n_assets, center=values[:lookback].mean(axis=0))
+    pushed = 0
+    realized = np.empty(n_days - lookback)
+    rebalance_days = list(range(lookback, n_days, rebalance_every))
+    weights_history = np.empty((len(rebalance_days), n_assets))
+    turnover = np.empty(len(rebalance_days))
+    drifted = None
+    weights = None
+
+    for k, start in enumerate(rebalance_days):
+        # Ventana [start - lookback, start): solo se agregan los días nuevos
+        for day in range(pushed, start):
+            stats.push(values[day])
+        pushed = start
+        if covariance == "sample":
+            cov_model = DenseCovariance(stats.covariance() * 252)
+        else:
+            cov_model = estimate_covariance(values[start - lookback:start], covariance).scaled(252)
+        optimal = max_sharpe_weights(stats.mean() * 252, cov_model.matvec, risk_free_rate,
+                                     max_weight=max_weight, min_weight=min_weight)
+        weights = optimal['weights'] if optimal['success'] or weights is None else weights
+        turnover[k] = np.abs(weights - drifted).sum() if drifted is not None else np.abs(weights).sum()
+        weights_history[k] = weights
+
+        # Período de tenencia: los pesos derivan con el crecimiento de cada activo
+        end = min(start + rebalance_every, n_days)
+        growth = np.cumprod(1 + values[start:end], axis=0)
+        portfolio_value = np.concatenate([[1.0], growth @ weights])
+        period_returns = portfolio_value[1:] / portfolio_value[:-1] - 1
+        period_returns[0] -= transaction_cost * turnover[k]
+        realized[start - lookback:end - lookback] = period_returns
+        drifted = weights * growth[-1] / portfolio_value[-1]
+
+    dates = returns.index[lookback:]
+    realized = pd.Series(realized, index=dates, name='Backtest')
+    equity = (1 + realized).cumprod()
+    drawdown = pd.Series(drawdowns(realized.to_numpy()), index=dates, name='Drawdown')
+    annual_return = float(realized.mean() * 252)
+    annual_volatility = float(realized.std() * np.sqrt(252))
+    tail = risk_report(realized.to_numpy()[:, None], [1.0], 0.95, risk_free_rate).iloc[0]
+    return {
+        'returns': realized,
+        'equity': equity,
+        'drawdown': drawdown,
+        'weights': pd.DataFrame(weights_history, index=returns.index[rebalance_days], columns=returns.columns),
+        'turnover': pd.Series(turnover, index=returns.index[rebalance_days], name='Turnover'),
+        'annual_return': annual_return,
+        'annual_volatility': annual_volatility,
+        'sharpe_ratio': (annual_return - risk_free_rate) / annual_volatility,
+        'max_drawdown': float(tail['max_drawdown']),
+        'var_95': float(tail['var_historical']),
+        'cvar_95': float(tail['cvar_historical']),
+        'sortino_ratio': float(tail['sortino_ratio']),
+        'calmar_ratio': float(tail['calmar_ratio'])
+    }
+
+
+def backtest_portfolios(portfolio_data: Dict[str, pd.DataFrame], risk_free_rate: float = None,
+                        **params) -> Dict[str, Dict]:
+    """Backtest de cada portafolio (por ejemplo, los cinco de DataLoader.process_portfolios)."""
+    if risk_free_rate is None:
+        risk_free_rate = get_average_risk_free_rate()
+    return {
+        name: walk_forward_backtest(data, risk_free_rate=risk_free_rate, **params)
+        for name, data in portfolio_data.items() if not data.empty
+    }
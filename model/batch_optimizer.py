@@ -0,0 +1,97 @@
+import os
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+from portfolio_analysis import PortfolioAnalyzer
+from risk_free import get_average_risk_free_rate
+
+
+def _optimize_portfolio(name: str, data: pd.DataFrame, risk_free_rate: float, max_weight: float,
+                        min_weight: float, frontier_points: int, covariance: str = "sample") -> Dict:
+    """
+    Analiza y optimiza un portafolio. Se ejecuta en un proceso del pool.
+
+    Un error se vuelve a lanzar como ValueError con el nombre del portafolio, para saber
+    desde el proceso principal cuál falló.
+    """
+    try:
+        analyzer = PortfolioAnalyzer(data, risk_free_rate=risk_free_rate, covariance=covariance)
+        returns, volatility = analyzer.calculate_metrics()
+        optimal_weights = analyzer.optimize_weights(max_weight=max_weight, min_weight=min_weight)
+        result = {
+            'returns': returns,
+            'volatility': volatility,
+            'optimal_weights': optimal_weights,
+            'performance': analyzer.portfolio_performance(optimal_weights['weights'])
+        }
+        if frontier_points > 0:
+            result['frontier'] = analyzer.efficient_frontier(frontier_points, max_weight=max_weight,
+                                                             min_weight=min_weight)
+    except Exception as e:
+        raise ValueError(f"Error optimizando el portafolio {name}: {e}") from e
+    return result
+
+
+def optimize_portfolios_detailed(portfolio_data: Dict[str, pd.DataFrame], risk_free_rate: float = None,
+                                 max_weight: float = 0.35, min_weight: float = 0.05,
+                                 frontier_points: int = 0, max_workers: int = None,
+                                 covariance: str = "sample") -> Dict[str, Dict]:
+    """
+    Optimiza varios portafolios en paralelo, uno por proceso.
+
+    Args:
+        portfolio_data: Precios de cada portafolio (como los devuelve DataLoader.process_portfolios).
+        risk_free_rate: Tasa libre de riesgo; si es None se obtiene una sola vez para todos.
+        max_weight: Peso máximo por activo.
+        min_weight: Peso mínimo por activo.
+        frontier_points: Si es mayor que 0, también calcula la frontera eficiente con esos puntos.
+        max_workers: Número de procesos (por defecto uno por núcleo). Con 1 se ejecuta en este proceso.
+        covariance: Estimador de covarianza de PortfolioAnalyzer ('sample', 'ledoit_wolf', 'ewma', 'factor').
+
+    Returns:
+        Dict[str, Dict]: Por portafolio, 'returns', 'volatility', 'optimal_weights', 'performance'
+                         y opcionalmente 'frontier'.
+    """
+    if risk_free_rate is None:
+        risk_free_rate = get_average_risk_free_rate()
+    jobs = {name: data for name, data in portfolio_data.items() if not data.empty}
+    args = (risk_free_rate, max_weight, min_weight, frontier_points, covariance)
+
+    workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        return {name: _optimize_portfolio(name, data, *args) for name, data in jobs.items()}
+
+    print(f"Optimizando {len(jobs)} portafolios con {workers} procesos")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {name: pool.submit(_optimize_portfolio, name, data, *args) for name, data in jobs.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def results_table(results: Dict[str, Dict]) -> pd.DataFrame:
+    """Reúne los resultados de todos los portafolios en una sola tabla (una fila por activo)."""
+    rows = []
+    for name, result in results.items():
+        weights = result['optimal_weights']['weights']
+        performance = result['performance']
+        for asset, weight in zip(result['returns'].index, weights):
+            rows.append({
+                'Portafolio': name,
+                'Activo': asset,
+                'Retorno Anualizado': result['returns'][asset],
+                'Volatilidad Anualizada': result['volatility'][asset],
+                'Peso Óptimo': weight,
+                'Retorno Portafolio': float(performance['return']),
+                'Volatilidad Portafolio': float(performance['volatility']),
+                'Sharpe Portafolio': float(performance['sharpe_ratio']),
+                'Optimización Exitosa': bool(result['optimal_weights']['success'])
+            })
+    return pd.DataFrame(rows)
+
+
+def optimize_portfolios(portfolio_data: Dict[str, pd.DataFrame], risk_free_rate: float = None,
+                        max_weight: float = 0.35, min_weight: float = 0.05,
+                        max_workers: int = None) -> pd.DataFrame:
+    """Optimiza varios portafolios en paralelo y devuelve una sola tabla de resultados."""
+    results = optimize_portfolios_detailed(portfolio_data, risk_free_rate, max_weight, min_weight,
+                                           max_workers=max_workers)
+    return results_table(results)
@@ -0,0 +1,39 @@
+# benchmark_inferencia.py
+import time
+from sklearn.ensemble import HistGradientBoostingRegressor
+from tree_ensemble import CompiledTreeEnsemble
+from ml_predictor import recursive_forecast
+from test_tree_ensemble import datos_sinteticos
+
+
+def medir(funcion, repeticiones):
+    """Tiempo promedio por llamada en microsegundos."""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+def ejecutar_benchmark():
+    # Mismos hiperparámetros que PortfolioPredictor.train_or_load_model
+    X, y = datos_sinteticos(1400)
+    model = HistGradientBoostingRegressor(max_iter=100, max_depth=15, random_state=42).fit(X, y)
+    compiled = CompiledTreeEnsemble.from_sklearn(model)
+    print(f"Nodos: {len(compiled.value)}, profundidad máxima: {compiled.max_depth}, tamaño: {compiled.nbytes / 1024:.0f} KB")
+
+    fila = X[:1]
+    sklearn_us = medir(lambda: model.predict(fila), 300)
+    compilado_us = medir(lambda: compiled.predict(fila), 300)
+    print(f"Una fila   sklearn: {sklearn_us:8.1f} µs   compilado: {compilado_us:8.1f} µs   mejora: {sklearn_us / compilado_us:.1f}x")
+
+    inicio = time.perf_counter()
+    recursive_forecast(model, X[-1], 252)
+    sklearn_s = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    recursive_forecast(compiled, X[-1], 252)
+    compilado_s = time.perf_counter() - inicio
+    print(f"Trayectoria de 252 días   sklearn: {sklearn_s:.3f} s   compilado: {compilado_s:.3f} s")
+
+
+if __name__ == "__main__":
+    ejecutar_benchmark()
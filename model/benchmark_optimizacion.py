@@ -0,0 +1,58 @@
+# benchmark_optimizacion.py
+import time
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+from portfolio_analysis import PortfolioAnalyzer
+
+
+def generar_precios(n_assets, n_days=1750, seed=42):
+    """Genera precios sintéticos con retornos correlacionados."""
+    rng = np.random.default_rng(seed)
+    factor = rng.normal(0.0003, 0.01, size=(n_days, 1))
+    returns = factor + rng.normal(0.0002, 0.01, size=(n_days, n_assets))
+    prices = 100 * np.cumprod(1 + returns, axis=0)
+    index = pd.bdate_range("2017-11-09", periods=n_days)
+    return pd.DataFrame(prices, index=index, columns=[f"A{i}" for i in range(n_assets)])
+
+
+def optimizar_sin_cache(analyzer, max_weight=0.35, min_weight=0.05):
+    """Versión anterior: recalcula media y covarianza en cada evaluación y usa diferencias finitas."""
+    n_assets = len(analyzer.data.columns)
+
+    def neg_sharpe_ratio(weights):
+        port_return = np.sum(analyzer.returns.mean() * weights) * 252
+        port_vol = np.sqrt(np.dot(weights.T, np.dot(analyzer.returns.cov() * 252, weights)))
+        return -(port_return - analyzer.risk_free_rate) / port_vol
+
+    result = minimize(neg_sharpe_ratio, n_assets * [1. / n_assets],
+                      method='SLSQP',
+                      bounds=tuple((min_weight, max_weight) for _ in range(n_assets)),
+                      constraints=[{'type': 'eq', 'fun': lambda x: np.sum(x) - 1}])
+    return {'weights': result.x, 'sharpe_ratio': -result.fun, 'success': result.success}
+
+
+def medir(funcion, repeticiones=3):
+    """Devuelve el mejor tiempo de varias ejecuciones y el último resultado."""
+    mejor, resultado = float("inf"), None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def ejecutar_benchmark(tamanos=(5, 10, 20, 40, 100, 200)):
+    print(f"{'Activos':>8} {'Antes (s)':>12} {'Después (s)':>12} {'Mejora':>8} {'Dif. Sharpe':>12}")
+    for n_assets in tamanos:
+        analyzer = PortfolioAnalyzer(generar_precios(n_assets), risk_free_rate=0.02)
+        max_weight = max(0.35, 2.0 / n_assets)
+        min_weight = min(0.05, 0.5 / n_assets)
+        antes, viejo = medir(lambda: optimizar_sin_cache(analyzer, max_weight, min_weight), repeticiones=1)
+        despues, nuevo = medir(lambda: analyzer.optimize_weights(max_weight, min_weight))
+        diferencia = abs(viejo['sharpe_ratio'] - nuevo['sharpe_ratio'])
+        print(f"{n_assets:>8} {antes:>12.4f} {despues:>12.4f} {antes / despues:>7.1f}x {diferencia:>12.2e}")
+
+
+if __name__ == "__main__":
+    ejecutar_benchmark()
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+ALIGNMENT_POLICIES = ("intersect", "ffill", "business_days")
+
+# Política por defecto de DataLoader, AnalysisPipeline y CompoundPortfolioAnalyzer: los días
+# en que cotizan todos los activos. Un día que falta no pierde movimiento, porque el retorno
+# del día siguiente se calcula desde el último precio común.
+DEFAULT_ALIGNMENT = "intersect"
+
+
+def to_trading_dates(index) -> pd.DatetimeIndex:
+    """
+    Convierte las fechas con zona horaria a fechas de calendario sin hora.
+
+    Las criptomonedas se guardan a las 00:00 UTC y las acciones, futuros y bonos a las
+    00:00 de Nueva York o Chicago (05:00 o 06:00 UTC), así que el mismo día de mercado
+    tiene distinta marca de tiempo según el activo. Al quedarse con la fecha, todos los
+    activos comparten un solo calendario.
+    """
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    return index.normalize()
+
+
+def align_prices(prices: pd.DataFrame, policy: str = "intersect", limit: int = None) -> pd.DataFrame:
+    """
+    Alinea los precios de varios activos en una matriz densa (sin NaN) con un calendario común.
+
+    Políticas:
+    - 'intersect': solo los días en que cotizan todos los activos.
+    - 'ffill': todos los días en que cotiza algún activo; los que no cotizan repiten su
+      último precio (a lo sumo `limit` días seguidos, si se indica).
+    - 'business_days': días hábiles (lunes a viernes) entre la primera y la última fecha;
+      cada activo toma su último precio disponible, así que el movimiento de fin de semana
+      de las criptomonedas queda en el retorno del lunes.
+
+    En todos los casos se descartan las fechas iniciales en que algún activo todavía no
+    tiene precio y, con 'ffill' o 'business_days', las que superan `limit`.
+
+    Returns:
+        pd.DataFrame: Un solo bloque float64, índice 'Date' sin zona horaria.
+    """
+    if policy not in ALIGNMENT_POLICIES:
+        raise ValueError(f"Política de alineación desconocida: {policy}. Use una de {ALIGNMENT_POLICIES}.")
+    if prices.empty:
+        return prices.copy()
+
+    prices = prices.copy()
+    prices.index = to_trading_dates(prices.index)
+    # Varias filas del mismo día (por ejemplo, activos con distinta hora): una por día
+    if prices.index.has_duplicates:
+        prices = prices.groupby(level=0).last()
+    prices = prices.sort_index()
+
+    if policy == "intersect":
+        aligned = prices.dropna(how="any")
+    else:
+        filled = prices.ffill(limit=limit)
+        if policy == "business_days":
+            calendar = pd.bdate_range(filled.index[0], filled.index[-1])
+            filled = filled.reindex(calendar, method="ffill", limit=limit)
+        aligned = filled.dropna(how="any")
+
+    aligned.index.name = "Date"
+    return pd.DataFrame(np.ascontiguousarray(aligned.to_numpy(dtype=float)), index=aligned.index,
+                        columns=aligned.columns)
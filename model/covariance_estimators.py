@@ -0,0 +1,120 @@
+import numpy as np
+from typing import Callable, Dict
+from sklearn.covariance import ledoit_wolf
+
+
+class DenseCovariance:
+    """Matriz de covarianza completa, O(N²) en memoria."""
+
+    def __init__(self, matrix: np.array):
+        self.matrix = np.ascontiguousarray(np.atleast_2d(matrix))
+
+    def matvec(self, weights: np.array) -> np.array:
+        """Σ · w (w puede ser un vector (N,) o una matriz (N, m))."""
+        return self.matrix @ weights
+
+    def diagonal(self) -> np.array:
+        return np.diag(self.matrix).copy()
+
+    def to_dense(self) -> np.array:
+        return self.matrix
+
+    def scaled(self, factor: float) -> "DenseCovariance":
+        return DenseCovariance(self.matrix * factor)
+
+
+class FactorCovariance:
+    """
+    Covarianza de un modelo de k factores: Σ = B·diag(f)·Bᵀ + diag(d).
+
+    Solo guarda las cargas B (N, k), las varianzas de los factores f (k,) y las varianzas
+    específicas d (N,), así que la memoria y el producto Σ · w son O(N·k) en lugar de O(N²).
+    """
+
+    def __init__(self, loadings: np.array, factor_variances: np.array, specific_variances: np.array):
+        self.loadings = np.ascontiguousarray(loadings)
+        self.factor_variances = np.asarray(factor_variances, dtype=np.float64)
+        self.specific_variances = np.asarray(specific_variances, dtype=np.float64)
+
+    def matvec(self, weights: np.array) -> np.array:
+        """Σ · w en O(N·k) (w puede ser un vector (N,) o una matriz (N, m))."""
+        factor_exposure = self.loadings.T @ weights
+        factor_exposure = (self.factor_variances * factor_exposure.T).T
+        return self.loadings @ factor_exposure + (self.specific_variances * weights.T).T
+
+    def diagonal(self) -> np.array:
+        return (self.loadings ** 2) @ self.factor_variances + self.specific_variances
+
+    def to_dense(self) -> np.array:
+        """Matriz completa (N, N); solo para inspección o universos chicos."""
+        return (self.loadings * self.factor_variances) @ self.loadings.T + np.diag(self.specific_variances)
+
+    def scaled(self, factor: float) -> "FactorCovariance":
+        return FactorCovariance(self.loadings, self.factor_variances * factor, self.specific_variances * factor)
+
+
+def sample_covariance(returns: np.array) -> DenseCovariance:
+    """Covarianza muestral de los retornos diarios."""
+    return DenseCovariance(np.cov(returns, rowvar=False))
+
+
+def ledoit_wolf_covariance(returns: np.array) -> DenseCovariance:
+    """
+    Covarianza con contracción de Ledoit-Wolf hacia una identidad escalada.
+
+    Bien condicionada aunque el número de activos se acerque al número de días.
+    """
+    shrunk, _ = ledoit_wolf(returns)
+    return DenseCovariance(shrunk)
+
+
+def ewma_covariance(returns: np.array, decay: float = 0.94) -> DenseCovariance:
+    """Covarianza con pesos exponenciales (RiskMetrics): el día t pesa decay^(días desde t)."""
+    if not 0 < decay < 1:
+        raise ValueError("El factor de decaimiento debe estar entre 0 y 1.")
+    weights = decay ** np.arange(len(returns) - 1, -1, -1, dtype=np.float64)
+    weights /= weights.sum()
+    centered = returns - weights @ returns
+    return DenseCovariance((centered * weights[:, None]).T @ centered)
+
+
+def factor_covariance(returns: np.array, n_factors: int = 3) -> FactorCovariance:
+    """
+    Modelo de factores estadísticos: los k primeros componentes principales de los retornos
+    y una varianza específica por activo (la parte de la varianza que no explican).
+    """
+    n_days, n_assets = returns.shape
+    n_factors = min(n_factors, n_assets, n_days - 1)
+    centered = returns - returns.mean(axis=0)
+    _, singular_values, components = np.linalg.svd(centered, full_matrices=False)
+    loadings = components[:n_factors].T
+    factor_variances = singular_values[:n_factors] ** 2 / (n_days - 1)
+    total_variances = (centered ** 2).sum(axis=0) / (n_days - 1)
+    explained = (loadings ** 2) @ factor_variances
+    specific_variances = np.maximum(total_variances - explained, 1e-12)
+    return FactorCovariance(loadings, factor_variances, specific_variances)
+
+
+COVARIANCE_ESTIMATORS: Dict[str, Callable] = {
+    "sample": sample_covariance,
+    "ledoit_wolf": ledoit_wolf_covariance,
+    "ewma": ewma_covariance,
+    "factor": factor_covariance,
+}
+
+
+def estimate_covariance(returns: np.array, method="sample", **params):
+    """
+    Estima la covarianza diaria con un método registrado o una función propia.
+
+    Args:
+        returns: Retornos diarios (días, activos).
+        method: 'sample', 'ledoit_wolf', 'ewma', 'factor' o una función returns -> modelo.
+        params: Parámetros del método (por ejemplo decay=0.97 o n_factors=5).
+    """
+    if callable(method):
+        return method(returns, **params)
+    if method not in COVARIANCE_ESTIMATORS:
+        raise ValueError(f"Estimador de covarianza desconocido: {method}. "
+                         f"Use uno de {sorted(COVARIANCE_ESTIMATORS)}.")
+    return COVARIANCE_ESTIMATORS[method](np.asarray(returns, dtype=np.float64), **params)
@@ -2,7 +2,6 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import time
 st.set_page_config(
     page_title="PortfolioOp",
     page_icon="🧭",
@@ -11,9 +10,9 @@ st.set_page_config(
 
 image_path = "./assets/logo3.png"
 # Import the necessary classes
-from data_loader import DataLoader
-from portfolio_analysis import PortfolioAnalyzer
-from ml_predictor import PortfolioPredictor
+from analysis_pipeline import AnalysisPipeline, RISK_PROFILE_WEIGHTS
+from profile_artifacts import PROFILES_FILE
+from calendar_alignment import DEFAULT_ALIGNMENT
 
 # Inicialización de variables de estado
 if 'started' not in st.session_state:
@@ -49,6 +48,7 @@ def calcular_perfil(total_score):
 def cambiar_seccion(nueva_seccion):
     st.session_state.section = nueva_seccion
 force_download = st.sidebar.checkbox("Descargar datos nuevamente", value=False)
+incremental_download = st.sidebar.checkbox("Actualizar solo los datos nuevos", value=False)
 def reiniciar_cuestionario():
     st.session_state.started = False
     st.session_state.section = 1
@@ -58,103 +58,37 @@ def reiniciar_cuestionario():
     st.session_state.submitted_section_1 = False
     st.session_state.submitted_section_2 = False
     st.rerun()
+@st.cache_resource
+def get_analysis_pipeline():
+    """Pipeline con caché, compartido por todas las sesiones del servidor.
+    Los cuatro perfiles se sirven desde el artefacto de precompute_profiles.py si existe.
+    Todos los portafolios usan el mismo calendario de días de mercado (DEFAULT_ALIGNMENT)."""
+    return AnalysisPipeline(artifact_path=PROFILES_FILE, alignment=DEFAULT_ALIGNMENT)
+
+
 def run_portfolio_analysis(portfolio_allocation):
     """
-    Run portfolio optimization and prediction based on allocation
+    Run portfolio optimization and prediction based on allocation.
+    Repeated requests with the same allocation, data and model are served from memory.
     """
     # Use a progress bar instead of multiple spinners
     progress_bar = st.progress(0)
     status_text = st.empty()
 
+    def progress(percent, text):
+        status_text.text(text)
+        progress_bar.progress(percent)
+
     try:
-        # 1. Define portfolios
-        status_text.text('Iniciando análisis de portafolio...')
-        progress_bar.progress(10)
-        
-        portfolios = {
-            "Bonos": ["^IRX", "^FVX", "^TNX", "^TYX"],
-            "ETFs": ["SPY", "QQQ", "VTI", "IVV", "XLV"],
-            "Acciones": ["MSFT", "GOOGL", "O", "PG", "ISRG", "MDT", "JPM"],
-            "Futuros": ["GC=F", "CL=F", "SI=F", "NQ=F", "ES=F"],
-            "Criptomonedas": ["BTC-USD", "ETH-USD", "BNB-USD", "TRX-USD", "DOGE-USD"]
-        }
-
-        # 2. Load data
-        status_text.text('Descargando datos históricos de mercado...')
-        progress_bar.progress(30)
-        loader = DataLoader(start_date="2017-11-09", end_date="2024-10-31")
-        portfolio_data = loader.process_portfolios(portfolios, force_download=force_download)
-
-        # 3. Analyze and optimize each selected portfolio
-        status_text.text('Preparando análisis de portafolio...')
-        progress_bar.progress(50)
-        investment_total = 100000  # Initial capital
-        results = {}
-
-        for i, (portfolio_name, allocation) in enumerate(portfolio_allocation.items(), 1):
-            status_text.text(f'Analizando portafolio: {portfolio_name}...')
-            progress_bar.progress(50 + (i * 10))
-            
-            if allocation > 0 and portfolio_name in portfolio_data:
-            # Skip if portfolio is empty
-                if portfolio_data[portfolio_name].empty:
-                    st.warning(f"No data available for {portfolio_name} portfolio")
-                    continue
-
-                # Perform analysis
-                analyzer = PortfolioAnalyzer(portfolio_data[portfolio_name])
-                
-                # Calculate metrics
-                returns, volatility = analyzer.calculate_metrics()
-                
-                # Optimize weights
-                optimal_weights = analyzer.optimize_weights()
-                
-                # Calculate portfolio performance
-                performance = analyzer.portfolio_performance(optimal_weights['weights'])
-                
-                # Predict returns
-                investment = investment_total * allocation
-                predictor = PortfolioPredictor(portfolio_data[portfolio_name], optimal_weights['weights'])
-                #predictor.train_or_load_model(train_new_model=True)
-                predictor.train_or_load_model(train_new_model=False, model_id=4)
-                
-                # Predictions for different time horizons
-                predictions = {
-                    3: predictor.predict_returns(investment, 3),
-                    5: predictor.predict_returns(investment, 5),
-                    10: predictor.predict_returns(investment, 10)
-                }
-                
-                
-                # Store results
-                results[portfolio_name] = {
-                    'returns': returns,
-                    'volatility': volatility,
-                    'optimal_weights': optimal_weights,
-                    'performance': performance,
-                    'predictions': predictions
-                }
-                predictions_summary = {}
-                for years, pred in predictions.items():
-                    final_value = pred['Portfolio_Value'].iloc[-1]
-                    total_return = (final_value - investment) / investment * 100
-                    predictions_summary[years] = {
-                        'predictions': pred,
-                        'initial_value': investment,  # Valor inicial del portafolio
-                        'final_value': final_value,
-                        'total_return': total_return
-                    }
-
-                # Update the results dictionary
-                results[portfolio_name]['predictions'] = predictions_summary
-                
-                
-
-
-        status_text.text('Finalizando análisis de portafolio...')
-        progress_bar.progress(100)
-        
+        progress(10, 'Iniciando análisis de portafolio...')
+        results = get_analysis_pipeline().run(portfolio_allocation, start_date="2017-11-09",
+                                              end_date="2024-10-31", investment_total=100000,
+                                              force_download=force_download,
+                                              incremental=incremental_download, progress=progress)
+        # Portafolios seleccionados sin datos
+        for message in results.warnings:
+            st.warning(message)
+        progress(100, 'Finalizando análisis de portafolio...')
         return results
 
     except Exception as e:
@@ -162,8 +96,6 @@ def run_portfolio_analysis(portfolio_allocation):
         progress_bar.progress(0)
         raise
     finally:
-        # Optional: clear the status text after completion
-        time.sleep(2)
         status_text.empty()
 
 
@@ -174,10 +106,11 @@ def display_portfolio_results(results):
     st.header("Análisis Detallado de Portafolio")
     
     # Tabs for different views
-    tab1, tab2, tab3 = st.tabs([
+    tab1, tab2, tab3, tab4 = st.tabs([
         "Rendimientos y Volatilidad", 
         "Distribución de Pesos", 
-        "Predicciones a Largo Plazo"
+        "Predicciones a Largo Plazo",
+        "Frontera Eficiente"
     ])
     
     # Diccionario con las descripciones de cada activo
@@ -323,6 +256,22 @@ def display_portfolio_results(results):
         st.dataframe(summary_df.style.format({
             'Suma Total de Valor Final': '${:,.2f}'
         }))
+
+    with tab4:
+        st.subheader("Frontera Eficiente por Portafolio")
+        fig, ax = plt.subplots(figsize=(10, 6))
+        for portfolio_name, portfolio_data in results.items():
+            frontier = portfolio_data['frontier']
+            line, = ax.plot(frontier['volatilities'] * 100, frontier['returns'] * 100, label=portfolio_name)
+            performance = portfolio_data['performance']
+            ax.scatter(float(performance['volatility']) * 100, float(performance['return']) * 100,
+                       color=line.get_color(), marker='*', s=150)
+        ax.set_xlabel('Volatilidad Anual (%)')
+        ax.set_ylabel('Rendimiento Anual (%)')
+        ax.set_title('Frontera eficiente (★ = portafolio de máximo Sharpe)')
+        ax.legend()
+        ax.grid(True)
+        st.pyplot(fig)
         
 
         
@@ -501,38 +450,7 @@ elif st.session_state.started:
 
         if st.button("Generar Análisis de Portafolio Detallado", key="btn_portfolio_analysis"):
             # Determine portfolio allocation based on risk profile
-            if perfil == "Conservador":
-                portfolio_allocation = {
-                    "Bonos": 0.8,
-                    "ETFs": 0.2,
-                    "Acciones": 0,
-                    "Futuros": 0,
-                    "Criptomonedas": 0
-                }
-            elif perfil == "Moderado":
-                portfolio_allocation = {
-                    "Bonos": 0.4,
-                    "ETFs": 0.4,
-                    "Acciones": 0.2,
-                    "Futuros": 0,
-                    "Criptomonedas": 0
-                }
-            elif perfil == "Agresivo":
-                portfolio_allocation = {
-                    "Bonos": 0.1,
-                    "ETFs": 0.3,
-                    "Acciones": 0.5,
-                    "Futuros": 0.1,
-                    "Criptomonedas": 0
-                }
-            else:  # Muy Agresivo
-                portfolio_allocation = {
-                    "Bonos": 0,
-                    "ETFs": 0.0,
-                    "Acciones": 0.6,
-                    "Futuros": 0.2,
-                    "Criptomonedas": 0.2
-                }
+            portfolio_allocation = dict(RISK_PROFILE_WEIGHTS[perfil])
             
             # Run portfolio analysis
             with st.spinner('Generando análisis de portafolio...'):
@@ -1,14 +1,47 @@
 import os
+import time
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import yfinance as yf
 import pandas as pd
-from typing import Dict, List
+from typing import Callable, Dict, List
+from price_store import PriceStore, to_utc_index
+from calendar_alignment import DEFAULT_ALIGNMENT, align_prices
+
+
+def yahoo_history(asset: str, start: str, end: str) -> pd.DataFrame:
+    """Proveedor por defecto: historial diario de Yahoo Finance."""
+    return yf.Ticker(asset).history(start=start, end=end)
+
 
 class DataLoader:
-    def __init__(self, start_date: str = "2017-11-09", end_date: str = "2024-10-31", data_dir: str = "data"):
+    def __init__(self, start_date: str = "2017-11-09", end_date: str = "2024-10-31", data_dir: str = "data",
+                 store_dir: str = None, use_store: bool = True,
+                 provider: Callable[[str, str, str], pd.DataFrame] = None,
+                 max_workers: int = 8, max_retries: int = 3, retry_backoff: float = 0.5,
+                 alignment: str = DEFAULT_ALIGNMENT, provider_name: str = None):
         self.start_date = start_date
         self.end_date = end_date
         self.data_dir = data_dir
+        # Función (activo, inicio, fin) -> DataFrame con columna 'Close'
+        self.provider = provider or yahoo_history
+        # Nombre del proveedor para los mensajes
+        self.provider_name = provider_name or ("Yahoo Finance" if provider is None
+                                               else getattr(provider, "__name__", type(provider).__name__))
+        # Descargas concurrentes: límite de hilos y reintentos (además del primer intento) con espera exponencial
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.failures = {}  # Activos que fallaron en la última descarga y su error
+        self.price_matrix = None  # Matriz alineada con todos los activos de process_portfolios
+        # Política de calendario de process_portfolios (ver calendar_alignment.py); None = unión de
+        # fechas, con las filas que falten a cada portafolio
+        self.alignment = alignment
+        self._aligned = {}  # Matrices densas ya alineadas, por (activos, política, límite)
         os.makedirs(self.data_dir, exist_ok=True)  # Crear la carpeta 'data' si no existe
+        # Almacén columnar con todos los activos (ver price_store.py)
+        self.store = PriceStore(store_dir or os.path.join(self.data_dir, "store"))
+        self.use_store = use_store
         print(f"Directorio de datos: {self.data_dir}")
 
     def _get_file_path(self, asset: str) -> str:
@@ -28,43 +61,259 @@ class DataLoader:
         """Carga los datos existentes desde un archivo CSV."""
         file_path = self._get_file_path(asset)
         print(f"Cargando datos existentes de {file_path}")
-        return pd.read_csv(file_path, index_col=0, parse_dates=True)
+        df = pd.read_csv(file_path, index_col=0)
+        df.index = to_utc_index(df.index)
+        return df
+
+    def _last_stored_date(self, asset: str) -> pd.Timestamp:
+        """Lee la última fecha guardada de un activo sin cargar todo el CSV."""
+        file_path = self._get_file_path(asset)
+        with open(file_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            block = b""
+            # Leer bloques desde el final hasta tener la última línea completa
+            while position > 0 and block.rstrip(b"\r\n").count(b"\n") < 1:
+                step = min(4096, position)
+                position -= step
+                f.seek(position)
+                block = f.read(step) + block
+        last_line = block.rstrip(b"\r\n").splitlines()[-1].decode("utf-8")
+        return pd.Timestamp(last_line.split(",")[0]).tz_convert("UTC")
+
+    def _fetch(self, asset: str, start: str) -> pd.DataFrame:
+        """Descarga precios de cierre de un activo desde el proveedor, con reintentos."""
+        attempts = self.max_retries + 1
+        for attempt in range(attempts):
+            try:
+                df = self.provider(asset, start, self.end_date)
+                break
+            except Exception as e:
+                if attempt == attempts - 1:
+                    raise
+                wait = self.retry_backoff * 2 ** attempt
+                print(f"Error descargando {asset} desde {self.provider_name} (intento {attempt + 1}/{attempts}): {e}. "
+                      f"Reintentando en {wait:.1f}s")
+                time.sleep(wait)
+        if df is None or df.empty:
+            return pd.DataFrame()
+        return df[['Close']].rename(columns={"Close": asset})
+
+    def _save_data(self, asset: str, df: pd.DataFrame) -> None:
+        """Guarda el historial completo de un activo en su CSV de forma atómica."""
+        file_path = self._get_file_path(asset)
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        df.to_csv(tmp_path)
+        os.replace(tmp_path, file_path)
+
+    def _download_asset(self, asset: str) -> int:
+        """
+        Descarga el historial completo de un activo y lo guarda en CSV.
+
+        Un ticker desconocido o retirado no lanza excepción en yfinance, sino que devuelve
+        un DataFrame vacío: se convierte en ValueError para que fetch_assets lo registre
+        en failures como cualquier otra descarga fallida.
+        """
+        print(f"Descargando datos para {asset} desde {self.provider_name}")
+        df = self._fetch(asset, self.start_date)
+        if df.empty:
+            raise ValueError(f"No se encontraron datos para {asset} en {self.provider_name}")
+        self._save_data(asset, df)
+        print(f"Datos descargados y guardados para {asset}")
+        return len(df)
+
+    def _append_data(self, asset: str, new_rows: pd.DataFrame) -> None:
+        """Agrega filas nuevas al CSV de un activo de forma atómica."""
+        file_path = self._get_file_path(asset)
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        shutil.copyfile(file_path, tmp_path)
+        with open(tmp_path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+            f.write(new_rows.to_csv(header=False, lineterminator="\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        # Reemplazar el archivo original solo cuando la copia está completa
+        os.replace(tmp_path, file_path)
+
+    def update_data(self, asset: str) -> int:
+        """
+        Descarga solo las barras posteriores a la última fecha guardada de un activo.
+
+        Returns:
+            int: Número de filas nuevas agregadas al CSV.
+        """
+        if not self._is_data_available(asset):
+            return self._download_asset(asset)
+
+        last_date = self._last_stored_date(asset)
+        start = (last_date + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+        if start >= self.end_date:
+            print(f"Datos de {asset} ya actualizados hasta {last_date.date()}")
+            return 0
 
-    def download_data(self, assets: List[str], force_download: bool = False) -> pd.DataFrame:
-        """Descarga datos históricos para una lista de activos o carga los existentes."""
+        print(f"Descargando datos nuevos para {asset} desde {start}")
+        df = self._fetch(asset, start)
+        if not df.empty:
+            df = df[to_utc_index(df.index) > last_date]
+        if df.empty:
+            print(f"No hay datos nuevos para {asset}")
+            return 0
+        self._append_data(asset, df)
+        print(f"{len(df)} filas nuevas agregadas para {asset}")
+        return len(df)
+
+    def build_store(self, assets: List[str] = None) -> PriceStore:
+        """Importa los CSV existentes al almacén columnar de precios."""
+        print(f"Construyendo almacén de precios en {self.store.store_dir}")
+        self.store = PriceStore.from_csv_dir(self.data_dir, self.store.store_dir, assets)
+        return self.store
+
+    def fetch_assets(self, assets: List[str], force_download: bool = False, incremental: bool = False) -> Dict[str, str]:
+        """
+        Descarga en paralelo los activos que lo necesitan, con un número limitado de hilos.
+
+        Sin force_download ni incremental solo se descargan los activos que no tienen CSV.
+
+        Returns:
+            Dict[str, str]: Activos que fallaron después de todos los reintentos, o que el
+                            proveedor devolvió sin datos, y su error.
+        """
+        assets = list(dict.fromkeys(assets))  # Sin duplicados, manteniendo el orden
+        if force_download or incremental:
+            pending = assets
+        else:
+            pending = [asset for asset in assets if not self._is_data_available(asset)]
+
+        failures = {}
+        if pending:
+            job = self.update_data if incremental else self._download_asset
+            workers = max(1, min(self.max_workers, len(pending)))
+            print(f"Descargando {len(pending)} activos con {workers} hilos")
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(job, asset): asset for asset in pending}
+                for future in as_completed(futures):
+                    asset = futures[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        failures[asset] = str(e)
+
+        self.failures = failures
+        if failures:
+            print(f"Descargas fallidas ({len(failures)} de {len(pending)}):")
+            for asset, error in failures.items():
+                print(f"  {asset}: {error}")
+        return failures
+
+    def download_data(self, assets: List[str], force_download: bool = False, incremental: bool = False) -> pd.DataFrame:
+        """
+        Descarga datos históricos para una lista de activos o carga los existentes.
+
+        Args:
+            assets: Lista de activos.
+            force_download: Si True, vuelve a descargar todo el historial de cada activo.
+            incremental: Si True, descarga solo las fechas que faltan después de la última guardada.
+        """
         print(f"Descargando datos para los activos: {assets}")
+        self.fetch_assets(assets, force_download=force_download, incremental=incremental)
+        return self.load_data(assets)
+
+    def load_data(self, assets: List[str]) -> pd.DataFrame:
+        """Carga los datos ya descargados de una lista de activos, sin acceder a la red."""
+        if self.use_store and self.store.has_assets(assets, self.data_dir):
+            # Una sola lectura binaria en lugar de un CSV por activo
+            print(f"Cargando datos desde el almacén {self.store.store_dir}")
+            result = self.store.read(assets)
+            print(f"Datos combinados: {result.shape[0]} filas, {result.shape[1]} columnas")
+            return result
+
         dataframes = []
         for asset in assets:
             try:
-                if not force_download and self._is_data_available(asset):
-                    # Cargar datos existentes si no se requiere una nueva descarga
+                if self._is_data_available(asset):
                     print(f"Cargando datos existentes para {asset}")
-                    df = self._load_existing_data(asset)
-                else:
-                    # Descargar los datos y guardarlos en un archivo CSV
-                    print(f"Descargando datos para {asset} desde Yahoo Finance")
-                    ticker = yf.Ticker(asset)
-                    df = ticker.history(start=self.start_date, end=self.end_date)
-                    if not df.empty:
-                        df = df[['Close']].rename(columns={"Close": asset})
-                        df.to_csv(self._get_file_path(asset))
-                        print(f"Datos descargados y guardados para {asset}")
-                    else:
-                        print(f"No se encontraron datos para {asset}")
-                dataframes.append(df)
+                    dataframes.append(self._load_existing_data(asset))
             except Exception as e:
                 print(f"Error procesando {asset}: {e}")
         
-        result = pd.concat(dataframes, axis=1) if dataframes else pd.DataFrame()
+        result = pd.concat(dataframes, axis=1, sort=True) if dataframes else pd.DataFrame()
         print(f"Datos combinados: {result.shape[0]} filas, {result.shape[1]} columnas")
         return result
     
-    def process_portfolios(self, portfolios: Dict[str, List[str]], force_download: bool = False) -> Dict[str, pd.DataFrame]:
-        """Procesa múltiples portafolios y retorna sus dataframes."""
+    def process_portfolios(self, portfolios: Dict[str, List[str]], force_download: bool = False,
+                           incremental: bool = False, alignment: str = None) -> Dict[str, pd.DataFrame]:
+        """
+        Procesa múltiples portafolios y retorna sus dataframes.
+
+        Con una política de alineación ('intersect', 'ffill' o 'business_days'; por defecto
+        la del constructor, 'intersect') todos los portafolios salen de una sola matriz densa
+        con un calendario común, así los análisis posteriores no vuelven a alinear ni
+        descartan filas. Con DataLoader(alignment=None) cada portafolio conserva sus fechas.
+        """
+        policy = alignment or self.alignment
         print(f"Procesando {len(portfolios)} portafolios")
+        # Unión de activos: cada uno se descarga y se carga una sola vez aunque esté en varios portafolios
+        all_assets = list(dict.fromkeys(asset for assets in portfolios.values() for asset in assets))
+        failures = self.fetch_assets(all_assets, force_download=force_download, incremental=incremental)
+        self.price_matrix = self.build_price_matrix(all_assets)
+        self.failures = failures
+
+        matrix = self.aligned_matrix(all_assets, policy) if policy else self.price_matrix
         portfolio_data = {
-            name: self.download_data(assets, force_download=force_download)
+            name: self.portfolio_view(assets, matrix)
             for name, assets in portfolios.items()
         }
         print(f"Portafolios procesados: {', '.join(portfolio_data.keys())}")
         return portfolio_data
+
+    def build_price_matrix(self, assets: List[str]) -> pd.DataFrame:
+        """Carga una matriz de precios alineada (un solo bloque float64) con todos los activos."""
+        data = self.load_data(assets)
+        matrix = pd.DataFrame(data.to_numpy(dtype=float), index=data.index, columns=data.columns)
+        self._aligned = {}  # Las matrices alineadas anteriores ya no corresponden
+        print(f"Matriz de precios compartida: {matrix.shape[0]} filas, {matrix.shape[1]} activos")
+        return matrix
+
+    def portfolio_view(self, assets: List[str], price_matrix: pd.DataFrame = None) -> pd.DataFrame:
+        """
+        Devuelve las columnas de un portafolio a partir de la matriz de precios compartida.
+
+        Si todas las filas de la matriz tienen algún precio del portafolio (por ejemplo, en
+        una matriz de aligned_matrix), el resultado es una vista que no copia los precios.
+        Si no, se devuelve una copia con las filas válidas, igual que el resultado de
+        concatenar los activos del portafolio por separado. En la matriz sin alinear eso es
+        lo habitual: las criptomonedas cotizan los fines de semana y cada mercado guarda
+        sus precios con su propia hora, así que casi ningún portafolio cubre todas las filas.
+        """
+        matrix = self.price_matrix if price_matrix is None else price_matrix
+        view = matrix[[asset for asset in assets if asset in matrix.columns]]
+        valid_rows = view.notna().any(axis=1)
+        if valid_rows.all():
+            return view
+        return view.loc[valid_rows]
+
+    def aligned_matrix(self, assets: List[str] = None, policy: str = "intersect", limit: int = None) -> pd.DataFrame:
+        """
+        Matriz densa de precios con un calendario común, calculada una vez por política.
+
+        Args:
+            assets: Activos (por defecto, todos los de la matriz de precios).
+            policy: 'intersect', 'ffill' o 'business_days' (ver align_prices).
+            limit: Máximo de días seguidos que se repite un precio con 'ffill' o 'business_days'.
+        """
+        if self.price_matrix is None:
+            if assets is None:
+                raise ValueError("No hay matriz de precios: indique los activos o llame a process_portfolios.")
+            self.price_matrix = self.build_price_matrix(assets)
+        assets = list(self.price_matrix.columns) if assets is None else list(assets)
+        key = (tuple(assets), policy, limit)
+        if key not in self._aligned:
+            columns = [asset for asset in assets if asset in self.price_matrix.columns]
+            aligned = align_prices(self.price_matrix[columns], policy, limit)
+            print(f"Matriz alineada ({policy}): {aligned.shape[0]} filas, {aligned.shape[1]} activos")
+            self._aligned[key] = aligned
+        return self._aligned[key]
@@ -2,6 +2,7 @@ from data_loader import DataLoader
 from portfolio_analysis import PortfolioAnalyzer
 from ml_predictor import PortfolioPredictor
 from portfolio_analysis import CompoundPortfolioAnalyzer
+from batch_optimizer import optimize_portfolios_detailed
 
 
 def main():
@@ -18,20 +19,8 @@ def main():
     loader = DataLoader()
     portfolio_data = loader.process_portfolios(portfolios)
     
-    # Analizar cada portafolio
-    portfolio_results = {}
-    for name, data in portfolio_data.items():
-        analyzer = PortfolioAnalyzer(data)
-        returns, volatility = analyzer.calculate_metrics()
-        optimal_weights = analyzer.optimize_weights()
-        
-        portfolio_results[name] = {
-            'returns': returns,
-            'volatility': volatility,
-            'optimal_weights': optimal_weights
-        }
-    
-       
+    # Analizar y optimizar todos los portafolios en paralelo (un proceso por portafolio)
+    portfolio_results = optimize_portfolios_detailed(portfolio_data)
 
     # Crear y analizar el portafolio compuesto
     compound_analyzer = CompoundPortfolioAnalyzer(portfolio_data)
@@ -4,89 +4,256 @@ from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.model_selection import train_test_split
 import numpy as np
 import pandas as pd
-from typing import Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, List, Sequence, Tuple, Union
+from tree_ensemble import CompiledTreeEnsemble
+from model_registry import ModelRegistry
+from model_cache import get_model_cache
+
+def recursive_forecast(model, windows: np.array, days: int) -> np.array:
+    """
+    Simula en bloque varias trayectorias recursivas con el mismo modelo.
+
+    Cada paso hace una sola llamada a model.predict con una fila por trayectoria. Las
+    ventanas se leen de un buffer preasignado de ancho window_size + days, donde la
+    ventana del paso t es la vista buffer[:, t:t + window_size]; así no se copia la
+    ventana en cada paso como con np.roll.
+
+    Args:
+        model: Modelo con método predict (por ejemplo HistGradientBoostingRegressor).
+        windows: Ventanas iniciales, (n_trayectorias, window_size) o (window_size,).
+        days: Número de pasos a simular.
+
+    Returns:
+        np.array: Retornos predichos, (n_trayectorias, days).
+    """
+    windows = np.atleast_2d(np.asarray(windows, dtype=np.float64))
+    n_paths, window_size = windows.shape
+    buffer = np.empty((n_paths, window_size + days))
+    buffer[:, :window_size] = windows
+    for t in range(days):
+        buffer[:, window_size + t] = model.predict(buffer[:, t:t + window_size])
+    return buffer[:, window_size:]
+
 
 class PortfolioPredictor:
     def __init__(self, portfolio_data: pd.DataFrame, weights: np.array):
         self.data = portfolio_data
         self.weights = weights
         self.model = None  # Se inicializa sin modelo
+        # Trayectoria recursiva ya simulada (se reutiliza entre horizontes), junto con el
+        # modelo y la última ventana histórica de la que salió
+        self._path = np.empty(0)
+        self._path_model = None
+        self._path_window = None
         self.models_dir = "models"
         os.makedirs(self.models_dir, exist_ok=True)  # Crear la carpeta si no existe
+        self.registry = ModelRegistry(self.models_dir)
+        self.model_key = None
 
-    def prepare_data(self, window_size: int = 30) -> Tuple[np.array, np.array]:
-
-        """Prepara los datos para el modelo."""
-
+    def _portfolio_returns(self) -> np.array:
+        """Retornos diarios del portafolio como arreglo contiguo."""
         if self.weights is not None:
             portfolio_returns = (self.data.pct_change() * self.weights).sum(axis=1)
         else:
             portfolio_returns = self.data.sum(axis=1)
+        return np.ascontiguousarray(portfolio_returns.to_numpy(dtype=np.float64))
+
+    @staticmethod
+    def _windows(returns: np.array, window_size: int) -> Tuple[np.array, np.array]:
+        """Ventanas deslizantes de retornos (X) y el retorno del día siguiente (y)."""
+        n_samples = len(returns) - window_size
+        if n_samples <= 0:
+            return np.empty((0, window_size)), np.empty(0)
+        # Vista con strides sobre el arreglo: fila i = returns[i:i + window_size]
+        X = sliding_window_view(returns, window_size)[:n_samples]
+        return X.copy(), returns[window_size:].copy()
+
+    def prepare_data(self, window_size: int = 30) -> Tuple[np.array, np.array]:
 
-        X, y = [], []
-        for i in range(window_size, len(portfolio_returns)):
-            X.append(portfolio_returns.iloc[i - window_size:i].values)
-            y.append(portfolio_returns.iloc[i])
+        """Prepara los datos para el modelo."""
+
+        return self._windows(self._portfolio_returns(), window_size)
 
-        return np.array(X), np.array(y)
+    def prepare_windows(self, window_sizes: List[int]) -> Dict[int, Tuple[np.array, np.array]]:
+        """Prepara X e y para varios tamaños de ventana calculando los retornos una sola vez."""
+        returns = self._portfolio_returns()
+        return {window_size: self._windows(returns, window_size) for window_size in window_sizes}
 
-    def train_or_load_model(self, train_new_model: bool = True, model_id: int = None) -> None:
+    def train_or_load_model(self, train_new_model: bool = True, model_id: Union[int, str] = None,
+                            window_size: int = 30) -> None:
         """
         Entrena un nuevo modelo o carga un modelo existente.
 
+        Los modelos nuevos se registran en ModelRegistry con una clave derivada de los datos
+        de entrenamiento, la ventana y los hiperparámetros; si ya existe un modelo con esa
+        clave se carga en lugar de volver a entrenarlo.
+
         Args:
-            train_new_model (bool): Si True, entrena y guarda un nuevo modelo.
+            train_new_model (bool): Si True, busca en el registro un modelo para estos datos y,
+                                    si no existe, lo entrena y lo registra.
                                     Si False, carga un modelo existente basado en model_id.
-            model_id (int): ID del modelo a cargar si train_new_model es False.
+            model_id (int | str): Clave del registro (o prefijo) o número de un modelo antiguo
+                                  model_{id}.pkl, si train_new_model es False.
+            window_size (int): Tamaño de ventana de las variables de entrada.
         """
         if train_new_model:
+            X, y = self.prepare_data(window_size)
+            params = {"max_iter": 100, "max_depth": 15, "random_state": 42, "test_size": 0.2}
+            self.model_key = self.registry.model_key(X, y, window_size, params)
+            if self.registry.find(self.model_key) is not None:
+                self.model = self._cached_model(self.model_key)
+                print(f"Modelo {self.model_key[:16]} reutilizado desde el registro.")
+                return
+
             # Entrenar un nuevo modelo
             print("Entrenando un nuevo modelo...")
-            X, y = self.prepare_data()
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-            self.model = HistGradientBoostingRegressor(max_iter=100, max_depth=15, random_state=42)
+            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=params["test_size"],
+                                                                random_state=params["random_state"])
+            self.model = HistGradientBoostingRegressor(max_iter=params["max_iter"], max_depth=params["max_depth"],
+                                                       random_state=params["random_state"])
             self.model.fit(X_train, y_train)
-            
-            # Guardar el modelo con un número secuencial
-            model_id = len(os.listdir(self.models_dir)) + 1
-            model_path = os.path.join(self.models_dir, f"model_{model_id}.pkl")
-            with open(model_path, "wb") as f:
-                pickle.dump(self.model, f)
+
+            model_path = self.registry.save(self.model_key, self.model, {
+                "window_size": window_size,
+                "params": params,
+                "n_samples": int(len(X))
+            })
             print(f"Modelo guardado en {model_path}")
         else:
             # Cargar un modelo existente
             if model_id is None:
                 raise ValueError("Debe proporcionar un model_id para cargar un modelo existente.")
+            if isinstance(model_id, str):
+                self.model_key = self.registry.resolve(model_id)
+                self.model = self._cached_model(self.model_key)
+                print(f"Modelo {model_id} cargado desde el registro.")
+                return
             model_path = os.path.join(self.models_dir, f"model_{model_id}.pkl")
             if not os.path.exists(model_path):
                 raise FileNotFoundError(f"El modelo {model_id} no existe en la carpeta {self.models_dir}.")
-            with open(model_path, "rb") as f:
-                self.model = pickle.load(f)
+            def load_legacy():
+                with open(model_path, "rb") as f:
+                    return pickle.load(f)
+            self.model = get_model_cache().get(
+                (os.path.abspath(model_path), os.path.getmtime(model_path)), load_legacy, path=model_path)
+            self.model_key = None
             print(f"Modelo {model_id} cargado desde {model_path}.")
 
-    def predict_returns(self, investment: float, years: int) -> pd.DataFrame:
-        """Predice retornos futuros para un monto de inversión."""
+    def compile_model(self) -> None:
+        """
+        Reemplaza el modelo cargado por su versión compilada en arreglos NumPy
+        (ver tree_ensemble.py), con la misma predicción y mucha menos latencia por fila.
+        """
+        if self.model is None:
+            raise ValueError("Debe entrenar o cargar un modelo antes de compilarlo.")
+        if isinstance(self.model, CompiledTreeEnsemble):
+            return
+        if self.model_key is not None:
+            # Modelo registrado: arreglos con mmap, compartidos por todo el proceso
+            self.model = self._cached_model(self.model_key, compiled=True)
+        else:
+            self.model = CompiledTreeEnsemble.from_sklearn(self.model)
+
+    def _cached_model(self, key: str, compiled: bool = False):
+        """Modelo registrado con esa clave, cargado una sola vez por proceso (ver model_cache.py)."""
+        cache_key = (os.path.abspath(self.models_dir), key, "compiled" if compiled else "pickle")
+        if compiled:
+            return get_model_cache().get(cache_key, lambda: self.registry.load_compiled(key))
+        return get_model_cache().get(cache_key, lambda: self.registry.load(key), path=self.registry.find(key))
+
+    def _simulate_path(self, days: int) -> np.array:
+        """
+        Devuelve los primeros `days` retornos de la trayectoria recursiva del modelo.
+
+        La trayectoria es determinística dados el modelo y la última ventana histórica, así
+        que se guarda y solo se extiende cuando se pide un horizonte más largo que el ya
+        simulado. Si cambian el modelo, los pesos o los datos, se vuelve a simular.
+        """
+        window = self._current_window()
+        missing = days - len(self._path)
+        if missing > 0:
+            forecast = recursive_forecast(self.model, window, missing)[0]
+            self._path = np.concatenate([self._path, forecast])
+        return self._path[:days]
+
+    def _current_window(self) -> np.array:
+        """
+        Última ventana conocida: datos históricos seguidos de la trayectoria ya simulada.
+
+        Descarta la trayectoria guardada si fue simulada con otro modelo o desde otra
+        ventana histórica (por ejemplo, tras cambiar self.weights o self.data).
+        """
         if self.model is None:
             raise ValueError("Debe entrenar o cargar un modelo antes de predecir.")
-        
-        days = years * 252
         last_window = self.prepare_data()[0][-1]
+        if self._path_model is not self.model or not np.array_equal(last_window, self._path_window):
+            self._path = np.empty(0)
+            self._path_model = self.model
+            self._path_window = last_window
+        return np.concatenate([last_window, self._path])[-len(last_window):]
+
+    @staticmethod
+    def simulate_batch(predictors: List["PortfolioPredictor"], days: int) -> None:
+        """
+        Simula la trayectoria de varios predictores a la vez (por ejemplo, uno por portafolio).
 
-        predictions = []
-        current_window = last_window
+        Los predictores que comparten el mismo modelo avanzan juntos con una sola llamada a
+        predict por paso. Las trayectorias quedan guardadas, así que predict_returns y
+        predict_horizons las reutilizan sin volver a llamar al modelo.
+        """
+        groups = {}
+        for predictor in predictors:
+            window = predictor._current_window()
+            if len(predictor._path) < days:
+                groups.setdefault((id(predictor.model), len(window)), []).append((predictor, window))
 
-        for _ in range(days):
-            pred = self.model.predict(current_window.reshape(1, -1))[0]
-            predictions.append(pred)
-            current_window = np.roll(current_window, -1)
-            current_window[-1] = pred
+        for group in groups.values():
+            model = group[0][0].model
+            missing = days - min(len(predictor._path) for predictor, _ in group)
+            forecasts = recursive_forecast(model, np.stack([window for _, window in group]), missing)
+            for (predictor, _), forecast in zip(group, forecasts):
+                predictor._path = np.concatenate([predictor._path, forecast])
 
-        cumulative_returns = (1 + np.array(predictions)).cumprod()
+    @staticmethod
+    def _projection(predictions: np.array, investment: float) -> pd.DataFrame:
+        """Arma la tabla de proyección a partir de los retornos diarios predichos."""
+        cumulative_returns = (1 + predictions).cumprod()
         projected_value = investment * cumulative_returns
 
         return pd.DataFrame({
-            'Day': range(1, days + 1),
+            'Day': range(1, len(predictions) + 1),
             'Predicted_Return': predictions,
             'Cumulative_Return': cumulative_returns,
             'Portfolio_Value': projected_value
         })
+
+    def predict_returns(self, investment: float, years: int) -> pd.DataFrame:
+        """Predice retornos futuros para un monto de inversión."""
+        days = years * 252
+        return self._projection(self._simulate_path(days).copy(), investment)
+
+    def predict_horizons(self, investments: Union[float, Sequence[float]],
+                         horizons: Sequence[int] = (3, 5, 10)) -> Dict:
+        """
+        Predice varios horizontes generando una sola trayectoria, la del horizonte más largo.
+
+        Args:
+            investments: Monto de inversión, o lista de montos.
+            horizons: Horizontes en años.
+
+        Returns:
+            Dict[int, pd.DataFrame] por horizonte (mismo formato que predict_returns) si se
+            pasa un solo monto; si se pasa una lista, Dict[monto, Dict[int, pd.DataFrame]].
+        """
+        path = self._simulate_path(max(horizons) * 252)
+        single = np.isscalar(investments)
+        amounts = [investments] if single else list(investments)
+
+        results = {}
+        for investment in amounts:
+            results[investment] = {
+                years: self._projection(path[:years * 252].copy(), investment)
+                for years in horizons
+            }
+        return results[investments] if single else results
@@ -0,0 +1,107 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable
+
+
+class ModelCache:
+    """
+    Caché de modelos compartida por todo el proceso, con desalojo LRU por tamaño en bytes.
+
+    Cada modelo se carga una sola vez; las siguientes peticiones con la misma clave
+    devuelven el mismo objeto. Cuando el total supera max_bytes se desalojan los modelos
+    usados hace más tiempo. El tamaño de un modelo es su atributo nbytes si lo tiene
+    (CompiledTreeEnsemble) o el tamaño en disco del archivo desde el que se cargó.
+
+    El lock solo protege las búsquedas, inserciones y desalojos. Las cargas corren fuera
+    de él, una sola vez por clave (como AnalysisPipeline._compute_once): quien pide un
+    modelo que se está cargando espera esa carga, y quien pide otro modelo no espera.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._pending: Dict[Hashable, Future] = {}  # Cargas en curso, por clave
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _size_of(model, path: str = None) -> int:
+        """Bytes del modelo: nbytes si lo tiene, si no el tamaño en disco de path (archivo o carpeta)."""
+        size = getattr(model, "nbytes", None)
+        if isinstance(size, int):
+            return size
+        if path is None:
+            return 0
+        if os.path.isdir(path):
+            return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+        return os.path.getsize(path)
+
+    def get(self, key: Hashable, loader: Callable[[], object], path: str = None):
+        """
+        Devuelve el modelo de la clave, cargándolo con loader() si no está en la caché.
+
+        Args:
+            key: Clave del modelo.
+            loader: Función sin argumentos que carga el modelo.
+            path: Archivo (o carpeta) desde el que loader carga el modelo; su tamaño cuenta
+                  para max_bytes cuando el modelo no tiene atributo nbytes.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = self._pending[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            model = loader()
+            size = self._size_of(model, path)
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._pending[key]
+            self._entries[key] = (model, size)
+            self.current_bytes += size
+            self._evict()
+        future.set_result(model)
+        return model
+
+    def _evict(self) -> None:
+        """Desaloja los modelos menos usados hasta respetar max_bytes (deja al menos uno)."""
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+_model_cache = ModelCache()
+
+
+def get_model_cache() -> ModelCache:
+    """Caché de modelos del proceso."""
+    return _model_cache
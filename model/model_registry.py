@@ -0,0 +1,195 @@
+import os
+import json
+import uuid
+import pickle
+import shutil
+import hashlib
+from datetime import datetime
+from contextlib import contextmanager
+import numpy as np
+from typing import Dict, Optional
+from tree_ensemble import CompiledTreeEnsemble
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class ModelRegistry:
+    """
+    Registro de modelos identificados por el contenido con que fueron entrenados.
+
+    La clave de un modelo es un hash SHA-256 de los datos de entrenamiento, el tamaño de
+    ventana y los hiperparámetros, así que un modelo equivalente se encuentra con una
+    búsqueda en el manifiesto (O(1)) en lugar de volver a entrenarlo. Los archivos se
+    escriben con nombre temporal y os.replace, y el manifiesto se actualiza con un lock
+    de archivo, de modo que varios procesos pueden registrar modelos a la vez.
+
+    Además del pickle, cada modelo se guarda compilado (CompiledTreeEnsemble) como un
+    archivo .npy por arreglo, que load_compiled abre con mmap: los procesos que cargan el
+    mismo modelo comparten sus páginas en la caché del sistema operativo.
+    """
+
+    MANIFEST_FILE = "manifest.json"
+    LOCK_FILE = "manifest.lock"
+
+    def __init__(self, models_dir: str = "models"):
+        self.models_dir = models_dir
+        os.makedirs(self.models_dir, exist_ok=True)
+        self._manifest = {}
+        self._manifest_stamp = None  # (mtime, tamaño, inodo) del manifiesto leído
+
+    @staticmethod
+    def model_key(X: np.array, y: np.array, window_size: int, params: Dict) -> str:
+        """Hash de los datos de entrenamiento, la ventana y los hiperparámetros."""
+        digest = hashlib.sha256()
+        for array in (X, y):
+            array = np.ascontiguousarray(array, dtype=np.float64)
+            digest.update(str(array.shape).encode("utf-8"))
+            digest.update(array.tobytes())
+        digest.update(json.dumps({"window_size": window_size, "params": params}, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.models_dir, self.MANIFEST_FILE)
+
+    def _read_manifest(self, force: bool = False) -> Dict:
+        """
+        Devuelve el manifiesto, releyéndolo solo si cambió en disco (o siempre, con force).
+
+        El cambio se detecta por fecha de modificación, tamaño e inodo: cada escritura
+        reemplaza el archivo, así que tiene un inodo nuevo aunque la fecha no alcance a
+        cambiar por la resolución del sistema de archivos.
+        """
+        try:
+            stat = os.stat(self._manifest_path())
+        except FileNotFoundError:
+            return {}
+        stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if force or stamp != self._manifest_stamp:
+            with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                self._manifest = json.load(f)
+            self._manifest_stamp = stamp
+        return self._manifest
+
+    @contextmanager
+    def _locked(self):
+        """Lock exclusivo entre procesos para modificar el manifiesto."""
+        with open(os.path.join(self.models_dir, self.LOCK_FILE), "a+b") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def find(self, key: str) -> Optional[str]:
+        """Ruta del modelo con esa clave, o None si no está registrado."""
+        entry = self._read_manifest().get(key)
+        if entry is None:
+            return None
+        path = os.path.join(self.models_dir, entry["file"])
+        return path if os.path.isfile(path) else None
+
+    def entry(self, key: str) -> Optional[Dict]:
+        """Metadatos registrados de un modelo."""
+        return self._read_manifest().get(key)
+
+    def _update_manifest(self, key: str, fields: Dict) -> None:
+        """Agrega o actualiza la entrada de un modelo en el manifiesto, bajo el lock."""
+        with self._locked():
+            # Releer siempre del disco dentro del lock para no pisar entradas de otros procesos
+            manifest = dict(self._read_manifest(force=True))
+            manifest[key] = {**manifest.get(key, {}), **fields}
+            tmp_manifest = f"{self._manifest_path()}.{uuid.uuid4().hex[:8]}.tmp"
+            with open(tmp_manifest, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_manifest, self._manifest_path())
+
+    def _write_compiled(self, key: str, model) -> Optional[str]:
+        """Exporta los arreglos del modelo compilado a una carpeta. None si no se puede compilar."""
+        try:
+            compiled = model if isinstance(model, CompiledTreeEnsemble) else CompiledTreeEnsemble.from_sklearn(model)
+        except (AttributeError, ValueError):
+            return None
+        dir_name = f"compiled_{key[:16]}"
+        path = os.path.join(self.models_dir, dir_name)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        os.makedirs(tmp_path)
+        for name, array in compiled.to_arrays().items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(array))
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Otro proceso ya exportó el mismo modelo (mismo contenido)
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        return dir_name
+
+    def save(self, key: str, model, metadata: Dict = None) -> str:
+        """Guarda un modelo y lo agrega al manifiesto. Devuelve la ruta del archivo."""
+        file_name = f"model_{key[:16]}.pkl"
+        path = os.path.join(self.models_dir, file_name)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(model, f)
+        os.replace(tmp_path, path)
+
+        fields = {
+            "file": file_name,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            **(metadata or {})
+        }
+        compiled_dir = self._write_compiled(key, model)
+        if compiled_dir is not None:
+            fields["compiled"] = compiled_dir
+        self._update_manifest(key, fields)
+        return path
+
+    def resolve(self, key: str) -> str:
+        """Clave completa a partir de una clave o de un prefijo único de ella."""
+        manifest = self._read_manifest()
+        if key in manifest:
+            return key
+        matches = [full_key for full_key in manifest if full_key.startswith(key)]
+        if len(matches) != 1:
+            raise FileNotFoundError(f"El modelo {key} no existe en el registro de {self.models_dir}.")
+        return matches[0]
+
+    def load(self, key: str):
+        """Carga el modelo registrado con esa clave (o con un prefijo único de ella)."""
+        key = self.resolve(key)
+        path = self.find(key)
+        if path is None:
+            raise FileNotFoundError(f"Falta el archivo del modelo {key} en {self.models_dir}.")
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def load_compiled(self, key: str, mmap: bool = True) -> CompiledTreeEnsemble:
+        """
+        Carga la versión compilada de un modelo registrado.
+
+        Con mmap=True los arreglos se abren con np.load(mmap_mode='r'): no se copian a la
+        memoria del proceso y solo se leen las páginas que usa la predicción. Si el modelo
+        se registró sin arreglos compilados, se compilan y exportan la primera vez.
+        """
+        key = self.resolve(key)
+        compiled_dir = self.entry(key).get("compiled")
+        if compiled_dir is None or not os.path.isdir(os.path.join(self.models_dir, compiled_dir)):
+            compiled_dir = self._write_compiled(key, self.load(key))
+            if compiled_dir is None:
+                raise ValueError(f"El modelo {key} no se puede compilar.")
+            self._update_manifest(key, {"compiled": compiled_dir})
+        path = os.path.join(self.models_dir, compiled_dir)
+        return CompiledTreeEnsemble.from_arrays({
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            for name in CompiledTreeEnsemble.ARRAY_NAMES
+        })
@@ -1,56 +1,211 @@
 import numpy as np
 import pandas as pd
 from scipy.optimize import minimize
-from typing import Dict, Tuple
+from typing import Callable, Dict, List, Sequence, Tuple
 from risk_free import get_average_risk_free_rate
+from rolling_stats import rolling_metrics
+from covariance_estimators import DenseCovariance, estimate_covariance
+from risk_metrics import risk_report
+from calendar_alignment import DEFAULT_ALIGNMENT, align_prices, to_trading_dates
 import matplotlib.pyplot as plt
 
 
+def max_sharpe_weights(mean_returns: np.array, cov_matvec: Callable[[np.array], np.array], risk_free_rate: float,
+                       max_weight: float = 0.35, min_weight: float = 0.05) -> Dict:
+    """
+    Pesos de máximo Sharpe con límites por activo (SLSQP con gradiente analítico).
+
+    Args:
+        mean_returns: Retornos medios anualizados.
+        cov_matvec: Función w -> Σ·w con la covarianza anualizada (ver covariance_estimators.py).
+        risk_free_rate: Tasa libre de riesgo anual.
+        max_weight: Peso máximo por activo.
+        min_weight: Peso mínimo por activo.
+    """
+    n_assets = len(mean_returns)
+
+    def neg_sharpe_ratio(weights):
+        # Devuelve el valor y el gradiente analítico, así SLSQP no usa diferencias finitas
+        cov_weights = cov_matvec(weights)
+        port_vol = np.sqrt(weights @ cov_weights)
+        excess_return = mean_returns @ weights - risk_free_rate
+        sharpe = excess_return / port_vol
+        gradient = -mean_returns / port_vol + excess_return * cov_weights / port_vol ** 3
+        return -sharpe, gradient
+
+    # Restricciones: suma de pesos = 1 y ningún peso mayor a max_weight
+    constraints = [
+        {'type': 'eq', 'fun': lambda x: np.sum(x) - 1, 'jac': lambda x: np.ones_like(x)},  # suma = 1
+    ]
+    bounds = tuple((min_weight, max_weight) for _ in range(n_assets))
+
+    result = minimize(neg_sharpe_ratio,
+                      n_assets * [1. / n_assets, ],
+                      method='SLSQP',
+                      jac=True,
+                      bounds=bounds,
+                      constraints=constraints)
+
+    return {
+        'weights': result.x,
+        'sharpe_ratio': -result.fun,
+        'success': result.success
+    }
+
+
 class PortfolioAnalyzer:
-    def __init__(self, data: pd.DataFrame, risk_free_rate: float = None):
-        self.data = data
-        self.returns = data.pct_change().dropna()
+    def __init__(self, data: pd.DataFrame, risk_free_rate: float = None, covariance="sample",
+                 covariance_params: Dict = None):
+        """
+        Args:
+            data: Precios de los activos.
+            risk_free_rate: Tasa libre de riesgo anual; por defecto se obtiene de risk_free.py.
+            covariance: Estimador de covarianza: 'sample', 'ledoit_wolf', 'ewma', 'factor' o una
+                        función propia (ver covariance_estimators.py). Solo 'sample' se
+                        actualiza de forma incremental en update.
+            covariance_params: Parámetros del estimador (por ejemplo {'n_factors': 5}).
+        """
+        self.covariance = covariance
+        self.covariance_params = covariance_params or {}
+        self._data = data
+        self._returns = data.pct_change().dropna()
+        # Barras agregadas con update que todavía no se copiaron a data/returns
+        self._pending_prices = []
+        self._pending_returns = []
         # Si no se proporciona risk_free_rate, se calcula desde risk_free.py
         self.risk_free_rate = risk_free_rate if risk_free_rate is not None else get_average_risk_free_rate()
+        self._compute_moments()
+
+    @property
+    def data(self) -> pd.DataFrame:
+        """Precios, incluidas las barras agregadas con update."""
+        self._flush_updates()
+        return self._data
+
+    @property
+    def returns(self) -> pd.DataFrame:
+        """Retornos diarios, incluidos los de las barras agregadas con update."""
+        self._flush_updates()
+        return self._returns
+
+    def _flush_updates(self) -> None:
+        """Copia a los DataFrames las barras pendientes, con un solo concat."""
+        if self._pending_prices:
+            dates, rows = zip(*self._pending_prices)
+            new_prices = pd.DataFrame(list(rows), index=pd.Index(dates, name=self._data.index.name),
+                                      columns=self._data.columns)
+            self._data = pd.concat([self._data, new_prices])
+            self._pending_prices = []
+        if self._pending_returns:
+            dates, rows = zip(*self._pending_returns)
+            new_returns = pd.DataFrame(list(rows), index=pd.Index(dates, name=self._returns.index.name),
+                                       columns=self._returns.columns)
+            self._returns = pd.concat([self._returns, new_returns])
+            self._pending_returns = []
+
+    def _compute_moments(self) -> None:
+        """
+        Calcula una sola vez los retornos medios y la matriz de covarianza anualizados.
+
+        Se guardan como arreglos NumPy contiguos para que el optimizador y las métricas
+        no vuelvan a recorrer el DataFrame de retornos en cada evaluación.
+        """
+        values = self._returns.to_numpy(dtype=float)
+        self.mean_returns = np.ascontiguousarray(values.mean(axis=0) * 252)
+        sample_cov = np.atleast_2d(np.cov(values, rowvar=False)) if self.covariance == "sample" else None
+        self._fit_covariance(values, sample_cov)
+        # Estado para update: cantidad de retornos, media diaria y suma de co-momentos
+        self._n_returns = len(values)
+        self._daily_mean = values.mean(axis=0)
+        if sample_cov is not None:
+            self._comoment = sample_cov * (self._n_returns - 1)
+        self._last_prices = self._data.iloc[-1].to_numpy(dtype=float) if len(self._data) else None
+
+    def _fit_covariance(self, values: np.array, sample_cov: np.array = None) -> None:
+        """Ajusta el modelo de covarianza anualizado (cov_model) con el estimador elegido."""
+        if sample_cov is not None:
+            self.cov_model = DenseCovariance(sample_cov * 252)
+        else:
+            self.cov_model = estimate_covariance(values, self.covariance, **self.covariance_params).scaled(252)
+
+    @property
+    def cov_matrix(self) -> np.array:
+        """Matriz de covarianza anualizada completa (N, N)."""
+        return self.cov_model.to_dense()
+
+    def update(self, new_prices) -> int:
+        """
+        Agrega barras de precios nuevas y actualiza media y covarianza.
+
+        Cada retorno nuevo actualiza la media y la suma de co-momentos con la recurrencia de
+        Welford, O(N²) por barra; el resultado es el mismo que construir de nuevo el analizador
+        con todos los precios. Las filas con algún precio faltante se descartan igual que en
+        pct_change().dropna().
+
+        Solo la media y la covarianza 'sample' son incrementales. Los demás estimadores
+        ('ledoit_wolf', 'ewma', 'factor' o una función propia) no tienen una actualización
+        por barra: en cada llamada se vuelven a estimar con todo el historial de retornos,
+        O(días · N²). Con esos estimadores conviene agregar varias barras en una sola llamada,
+        así la covarianza se estima una vez y no una por barra.
+
+        Args:
+            new_prices: pd.Series (una barra, con la fecha como name) o pd.DataFrame con las
+                        mismas columnas que los datos y fechas posteriores a la última.
+
+        Returns:
+            int: Cantidad de retornos agregados.
+        """
+        labels = new_prices.index if isinstance(new_prices, pd.Series) else new_prices.columns
+        missing = set(self._data.columns) - set(labels)
+        if missing:
+            raise ValueError(f"Faltan precios de los activos: {sorted(missing)}")
+        if isinstance(new_prices, pd.Series):
+            dates = [new_prices.name]
+            values = new_prices[self._data.columns].to_numpy(dtype=float).reshape(1, -1)
+        else:
+            dates = new_prices.index
+            values = new_prices[list(self._data.columns)].to_numpy(dtype=float)
+
+        added = 0
+        for date, prices in zip(dates, values):
+            self._pending_prices.append((date, prices))
+            if self._last_prices is not None:
+                daily_return = prices / self._last_prices - 1
+                if not np.isnan(daily_return).any():
+                    self._n_returns += 1
+                    delta = daily_return - self._daily_mean
+                    self._daily_mean = self._daily_mean + delta / self._n_returns
+                    if self.covariance == "sample":
+                        # Forma simétrica de delta ⊗ (r - media nueva)
+                        self._comoment += np.outer(delta, delta) * ((self._n_returns - 1) / self._n_returns)
+                    self._pending_returns.append((date, daily_return))
+                    added += 1
+            self._last_prices = prices
+
+        if added:
+            self.mean_returns = self._daily_mean * 252
+            if self.covariance != "sample":
+                self._fit_covariance(self.returns.to_numpy(dtype=float))
+            elif self._n_returns > 1:
+                self.cov_model = DenseCovariance(self._comoment / (self._n_returns - 1) * 252)
+        return added
 
     def calculate_metrics(self) -> Tuple[pd.Series, pd.Series]:
         """Calcula retorno y volatilidad por activo."""
-        annual_returns = self.returns.mean() * 252
-        annual_volatility = self.returns.std() * np.sqrt(252)
+        annual_returns = pd.Series(self.mean_returns, index=self.returns.columns)
+        annual_volatility = pd.Series(np.sqrt(self.cov_model.diagonal()), index=self.returns.columns)
         return annual_returns, annual_volatility
     
     def optimize_weights(self, max_weight: float = 0.35, min_weight: float = 0.05) -> Dict:
         """Optimiza los pesos del portafolio usando Sharpe Ratio con restricción de peso máximo."""
-        n_assets = len(self.data.columns)
-        
-        def neg_sharpe_ratio(weights):
-            port_return = np.sum(self.returns.mean() * weights) * 252
-            port_vol = np.sqrt(np.dot(weights.T, np.dot(self.returns.cov() * 252, weights)))
-            sharpe = (port_return - self.risk_free_rate) / port_vol
-            return -sharpe
-        
-        # Restricciones: suma de pesos = 1 y ningún peso mayor a max_weight
-        constraints = [
-            {'type': 'eq', 'fun': lambda x: np.sum(x) - 1},  # suma = 1
-        ]
-        bounds = tuple((min_weight, max_weight) for _ in range(n_assets))  # 0 ≤ peso ≤ 0.6
-        
-        result = minimize(neg_sharpe_ratio, 
-                        n_assets * [1./n_assets,],
-                        method='SLSQP',
-                        bounds=bounds,
-                        constraints=constraints)
-        
-        return {
-            'weights': result.x,
-            'sharpe_ratio': -result.fun,
-            'success': result.success
-        }
+        return max_sharpe_weights(self.mean_returns, self.cov_model.matvec, self.risk_free_rate,
+                                  max_weight=max_weight, min_weight=min_weight)
 
     def portfolio_performance(self, weights: np.array) -> Dict:
         """Calcula el rendimiento y riesgo del portafolio."""
-        portfolio_return = np.sum(self.returns.mean() * weights) * 252
-        portfolio_vol = np.sqrt(np.dot(weights.T, np.dot(self.returns.cov() * 252, weights)))
+        weights = np.asarray(weights, dtype=float)
+        portfolio_return = self.mean_returns @ weights
+        portfolio_vol = np.sqrt(weights @ self.cov_model.matvec(weights))
         
         return {
             'return': portfolio_return,
@@ -58,6 +213,96 @@ class PortfolioAnalyzer:
             'sharpe_ratio': (portfolio_return - self.risk_free_rate) / portfolio_vol
         }
 
+    def efficient_frontier(self, n_points: int = 30, max_weight: float = 0.35, min_weight: float = 0.05) -> Dict:
+        """
+        Calcula la frontera eficiente para una grilla de retornos objetivo.
+
+        Cada punto minimiza la varianza para su retorno objetivo y parte de la solución
+        del punto anterior, reutilizando la covarianza precalculada del analizador.
+
+        Args:
+            n_points (int): Número de puntos de la frontera.
+            max_weight (float): Peso máximo por activo.
+            min_weight (float): Peso mínimo por activo.
+
+        Returns:
+            Dict: Arreglos 'returns', 'volatilities', 'sharpe_ratios' (n_points,),
+                  'weights' (n_points, n_activos) y 'success' por punto.
+        """
+        n_assets = len(self.data.columns)
+        if n_assets * min_weight > 1 + 1e-9 or n_assets * max_weight < 1 - 1e-9:
+            raise ValueError("Los límites de peso no permiten que los pesos sumen 1.")
+        mean_returns, cov_matvec = self.mean_returns, self.cov_model.matvec
+
+        def variance(weights):
+            cov_weights = cov_matvec(weights)
+            return weights @ cov_weights, 2 * cov_weights
+
+        bounds = tuple((min_weight, max_weight) for _ in range(n_assets))
+        sum_constraint = {'type': 'eq', 'fun': lambda x: np.sum(x) - 1, 'jac': lambda x: np.ones_like(x)}
+
+        # Extremo inferior: portafolio de mínima varianza
+        min_variance = minimize(variance, np.full(n_assets, 1. / n_assets), method='SLSQP',
+                                jac=True, bounds=bounds, constraints=[sum_constraint], tol=1e-12)
+
+        # Extremo superior: máximo retorno posible con los límites de peso
+        max_return_weights = np.full(n_assets, min_weight)
+        remaining = 1 - n_assets * min_weight
+        for i in np.argsort(-mean_returns):
+            extra = min(max_weight - min_weight, remaining)
+            max_return_weights[i] += extra
+            remaining -= extra
+
+        targets = np.linspace(mean_returns @ min_variance.x, mean_returns @ max_return_weights, n_points)
+        weights = np.empty((n_points, n_assets))
+        success = np.empty(n_points, dtype=bool)
+        current = min_variance.x
+        for i, target in enumerate(targets):
+            target_constraint = {'type': 'eq', 'fun': lambda x, t=target: mean_returns @ x - t,
+                                 'jac': lambda x: mean_returns}
+            result = minimize(variance, current, method='SLSQP', jac=True, bounds=bounds,
+                              constraints=[sum_constraint, target_constraint], tol=1e-12)
+            # Arranque en caliente: el siguiente punto parte de esta solución
+            current = result.x
+            weights[i] = result.x
+            success[i] = result.success
+
+        returns = weights @ mean_returns
+        volatilities = np.sqrt(np.sum(weights * cov_matvec(weights.T).T, axis=1))
+        return {
+            'returns': returns,
+            'volatilities': volatilities,
+            'sharpe_ratios': (returns - self.risk_free_rate) / volatilities,
+            'weights': weights,
+            'success': success
+        }
+
+    def risk_metrics(self, weights: np.array, confidence: float = 0.95) -> pd.DataFrame:
+        """
+        VaR, CVaR, máxima caída, Sortino y Calmar de uno o muchos portafolios (ver risk_metrics.py).
+
+        Args:
+            weights: Pesos (n_activos,) o una matriz (n_portafolios, n_activos), por ejemplo
+                     los 'weights' de efficient_frontier.
+            confidence: Nivel de confianza del VaR y el CVaR.
+
+        Returns:
+            pd.DataFrame: Una fila por portafolio. El VaR paramétrico usa el estimador de
+                          covarianza del analizador.
+        """
+        daily_cov = self.cov_model.scaled(1 / 252)
+        return risk_report(self.returns, weights, confidence, self.risk_free_rate, cov_matvec=daily_cov.matvec)
+
+    def rolling_statistics(self, windows: Sequence[int] = (30, 90, 252), weights: np.array = None) -> Dict[int, Dict]:
+        """
+        Volatilidad, Sharpe y correlaciones móviles de los activos (ver rolling_stats.py).
+
+        Args:
+            windows: Tamaños de ventana en días.
+            weights: Pesos del portafolio para calcular también su volatilidad y Sharpe móviles.
+        """
+        return rolling_metrics(self.returns, windows, self.risk_free_rate, weights)
+
     def distribution_graphics(self, weights: np.array, title: str = "Portfolio Distribution", 
                               others: float = 0.05, cmap: str = "tab20", height: int = 6, 
                               width: int = 10, nrow: int = 25, ax=None):
@@ -114,38 +359,104 @@ class PortfolioAnalyzer:
 
 
 class CompoundPortfolioAnalyzer:
-    def __init__(self, portfolio_data: Dict[str, pd.DataFrame], portfolio_weights: Dict[str, float] = None, risk_free_rate: float = None):
+    def __init__(self, portfolio_data: Dict[str, pd.DataFrame], portfolio_weights: Dict[str, float] = None,
+                 risk_free_rate: float = None, asset_weights: Dict[str, np.array] = None,
+                 alignment: str = DEFAULT_ALIGNMENT):
         """
         Inicializa el analizador de portafolio compuesto.
         
         Args:
             portfolio_data: Diccionario con los datos de cada portafolio
             portfolio_weights: Pesos de cada portafolio en el portafolio total
+            asset_weights: Pesos de los activos dentro de cada portafolio (por ejemplo, los
+                           óptimos de optimize_weights). Por defecto, pesos iguales.
+            alignment: Calendario común de los precios de todos los portafolios ('intersect',
+                       'ffill' o 'business_days', ver calendar_alignment.py). Con None cada
+                       portafolio conserva sus días y los que no cotiza cuentan como retorno 0.
         """
         self.portfolio_data = portfolio_data
+        self.alignment = alignment
         self.risk_free_rate = risk_free_rate if risk_free_rate is not None else get_average_risk_free_rate()
         self.portfolio_weights = portfolio_weights or {name: 0.2 for name in portfolio_data.keys()}
+        self.asset_weights = asset_weights or {}
         self.create_compound_returns()
-        
-    def create_compound_returns(self):
-        """Crea los retornos del portafolio compuesto."""
-        # Calcular retornos para cada portafolio individual
-        portfolio_returns = {}
-        for name, data in self.portfolio_data.items():
-            portfolio_returns[name] = data.pct_change().dropna()
-            
-        # Crear un DataFrame con todos los retornos
-        all_returns = pd.DataFrame()
-        for name, returns in portfolio_returns.items():
-            # Multiplicar los retornos por el peso del portafolio
-            weighted_returns = returns.mul(self.portfolio_weights[name])
-            if all_returns.empty:
-                all_returns = weighted_returns
+
+    def _aligned_returns(self) -> Tuple[pd.DatetimeIndex, List[str], np.array, np.array]:
+        """
+        Retornos de todos los activos alineados en un solo calendario, en una sola pasada.
+
+        Las fechas de cada portafolio se llevan a fechas de calendario (to_trading_dates)
+        antes de combinarlos: cada mercado guarda sus precios con su propia hora (00:00 UTC
+        la cripto, 00:00 de Nueva York o Chicago el resto), y sin esto el mismo día de
+        mercado quedaría en filas distintas, cada una con un solo portafolio.
+
+        Con una política de alineación, los precios de todos los portafolios se alinean
+        juntos (align_prices) y los retornos salen de esa matriz densa. Sin política, un día
+        en que un portafolio no cotiza cuenta como retorno 0 para sus activos (el precio no
+        cambió), así que portafolios de distinto largo se combinan bien.
+
+        Returns:
+            Calendario, nombres de los activos, matriz de retornos (días, activos) y el vector
+            de pesos de cada columna (peso del portafolio × peso del activo).
+        """
+        sleeves = {name: data for name, data in self.portfolio_data.items() if not data.empty}
+        if self.alignment and sleeves:
+            prices = pd.concat(sleeves.values(), axis=1, sort=True)
+            # Un activo presente en varios portafolios se alinea una sola vez
+            prices = prices.loc[:, ~prices.columns.duplicated()]
+            aligned_returns = align_prices(prices, self.alignment).pct_change().dropna()
+        returns_list, column_weights = [], []
+        for name, data in sleeves.items():
+            if self.alignment:
+                returns_list.append(aligned_returns[list(data.columns)])
             else:
-                # Alinear las fechas antes de sumar
-                all_returns = all_returns.add(weighted_returns, fill_value=0)
-                
-        self.compound_returns = all_returns
+                prices = data.set_axis(to_trading_dates(data.index), axis=0)
+                if prices.index.has_duplicates:
+                    # Activos del mismo portafolio guardados con distinta hora: una fila por día
+                    prices = prices.groupby(level=0).last()
+                returns_list.append(prices.sort_index().pct_change().dropna())
+            weights = self.asset_weights.get(name)
+            if weights is None:
+                weights = np.full(data.shape[1], 1. / data.shape[1])
+            column_weights.append(self.portfolio_weights.get(name, 0) * np.asarray(weights, dtype=float))
+
+        if not returns_list:
+            return pd.DatetimeIndex([]), [], np.empty((0, 0)), np.empty(0)
+        # Una sola alineación de todos los portafolios en lugar de un add por portafolio
+        aligned = pd.concat(returns_list, axis=1, join='outer', sort=True)
+        values = np.nan_to_num(aligned.to_numpy(dtype=float), nan=0.0)
+        return aligned.index, list(aligned.columns), values, np.concatenate(column_weights)
+
+    def create_compound_returns(self):
+        """
+        Crea los retornos del portafolio compuesto.
+
+        - portfolio_returns: serie de retornos diarios del portafolio total, R @ w.
+        - compound_returns: retornos de cada activo multiplicados por el peso de su
+          portafolio (formato anterior, una columna por activo).
+        """
+        index, columns, values, column_weights = self._aligned_returns()
+        self.portfolio_returns = pd.Series(values @ column_weights, index=index, name='Portfolio')
+
+        sleeve_weights = np.concatenate([
+            np.full(data.shape[1], self.portfolio_weights.get(name, 0))
+            for name, data in self.portfolio_data.items() if not data.empty
+        ]) if columns else np.empty(0)
+        compound_returns = pd.DataFrame(values * sleeve_weights, index=index, columns=columns)
+        if compound_returns.columns.has_duplicates:
+            # Un activo presente en varios portafolios se suma en una sola columna
+            compound_returns = compound_returns.T.groupby(level=0, sort=False).sum().T
+        self.compound_returns = compound_returns
+
+    def get_portfolio_metrics(self) -> Dict:
+        """Retorno, volatilidad y Sharpe anualizados de la serie del portafolio total."""
+        annual_return = float(self.portfolio_returns.mean() * 252)
+        annual_vol = float(self.portfolio_returns.std() * np.sqrt(252))
+        return {
+            'return': annual_return,
+            'volatility': annual_vol,
+            'sharpe_ratio': (annual_return - self.risk_free_rate) / annual_vol
+        }
 
     def get_compound_metrics(self) -> Dict:
         """Calcula métricas para el portafolio compuesto."""
@@ -0,0 +1,56 @@
+import sys
+from datetime import datetime
+from typing import Dict, List
+from analysis_pipeline import (AnalysisPipeline, RISK_PROFILE_WEIGHTS, MODELS_DIR, allocation_key,
+                               data_version, model_version)
+from profile_artifacts import PROFILES_FILE, compact_results, save_profiles
+from calendar_alignment import DEFAULT_ALIGNMENT
+
+
+def precompute_profiles(output_path: str = PROFILES_FILE, data_dir: str = "data",
+                        start_date: str = "2017-11-09", end_date: str = "2024-10-31",
+                        investment_total: float = 100000,
+                        profiles: Dict[str, Dict[str, float]] = None,
+                        portfolios: Dict[str, List[str]] = None, alignment: str = DEFAULT_ALIGNMENT) -> str:
+    """
+    Calcula métricas, pesos óptimos y proyecciones de cada perfil de riesgo y los guarda
+    en un solo artefacto que la aplicación sirve sin recalcular.
+
+    Todos los perfiles comparten una carga de datos y un modelo. El artefacto guarda las
+    versiones de ambos y AnalysisPipeline deja de servirlo si cambian, así que hay que
+    volver a ejecutarlo después de actualizar los datos o el modelo.
+    """
+    profiles = profiles or RISK_PROFILE_WEIGHTS
+    pipeline = AnalysisPipeline(data_dir=data_dir, portfolios=portfolios, alignment=alignment)
+    artifact = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "start_date": start_date,
+        "end_date": end_date,
+        "investment_total": investment_total,
+        "alignment": alignment,
+        "profiles": {},
+        "by_allocation": {},
+        "warnings": {}
+    }
+    for profile, allocation in profiles.items():
+        print(f"Precalculando perfil {profile}...")
+        results = pipeline.run(allocation, start_date=start_date, end_date=end_date,
+                               investment_total=investment_total)
+        compact = compact_results(results)
+        artifact["profiles"][profile] = {"allocation": dict(allocation), "results": compact}
+        artifact["by_allocation"][allocation_key(allocation)] = compact
+        artifact["warnings"][allocation_key(allocation)] = list(results.warnings)
+
+    # Versiones con que se calculó: el pipeline solo sirve el artefacto si siguen vigentes
+    artifact["data_version"] = data_version(data_dir, pipeline.assets)
+    artifact["model_version"] = model_version(MODELS_DIR)
+    path = save_profiles(artifact, output_path)
+    print(f"Perfiles precalculados guardados en {path}")
+    return path
+
+
+if __name__ == "__main__":
+    # Uso: python precompute_profiles.py [archivo_de_salida] [carpeta_de_datos]
+    output_path = sys.argv[1] if len(sys.argv) > 1 else PROFILES_FILE
+    data_dir = sys.argv[2] if len(sys.argv) > 2 else "data"
+    precompute_profiles(output_path, data_dir)
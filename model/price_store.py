@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import uuid
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+
+def to_utc_index(index) -> pd.DatetimeIndex:
+    """Convierte un índice de fechas (posiblemente con offsets mixtos) a UTC."""
+    return pd.DatetimeIndex(pd.to_datetime(index, utc=True), name="Date")
+
+
+class PriceStore:
+    """
+    Almacén columnar de precios de cierre.
+
+    Guarda todos los activos en una única matriz NumPy (filas = fechas, columnas = activos)
+    que se abre con memory-map, junto con un índice de fechas compartido en UTC y un
+    manifiesto JSON. Cargar cualquier subconjunto de activos cuesta una lectura binaria
+    en lugar de parsear un CSV por activo.
+    """
+
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self._manifest = None
+        self._index = None
+        self._prices = None
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.store_dir, self.MANIFEST_FILE)
+
+    def exists(self) -> bool:
+        """Verifica si el almacén ya fue creado."""
+        return os.path.isfile(self._manifest_path())
+
+    def _load(self) -> None:
+        """Lee el manifiesto y abre la matriz de precios con memory-map."""
+        with open(self._manifest_path(), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest != self._manifest:
+            self._manifest = manifest
+            self._index = pd.DatetimeIndex(
+                np.load(os.path.join(self.store_dir, manifest["index_file"])), name="Date"
+            ).tz_localize("UTC")
+            self._prices = np.load(os.path.join(self.store_dir, manifest["prices_file"]), mmap_mode="r")
+
+    @property
+    def tickers(self) -> List[str]:
+        """Activos disponibles en el almacén."""
+        if not self.exists():
+            return []
+        self._load()
+        return list(self._manifest["tickers"])
+
+    def has_assets(self, assets: List[str], data_dir: Optional[str] = None) -> bool:
+        """
+        Verifica si todos los activos están en el almacén.
+
+        Si se indica data_dir, además comprueba que los CSV de origen no hayan cambiado
+        desde que se construyó el almacén (comparando su fecha de modificación).
+        """
+        if not self.exists():
+            return False
+        self._load()
+        sources = self._manifest.get("sources", {})
+        for asset in assets:
+            if asset not in self._manifest["tickers"]:
+                return False
+            if data_dir is not None:
+                file_path = os.path.join(data_dir, f"{asset}.csv")
+                if not os.path.isfile(file_path) or os.stat(file_path).st_mtime_ns != sources.get(asset):
+                    return False
+        return True
+
+    def read(self, assets: List[str]) -> pd.DataFrame:
+        """Devuelve los precios de los activos pedidos, sin filas completamente vacías."""
+        self._load()
+        positions = [self._manifest["tickers"].index(asset) for asset in assets]
+        values = np.asarray(self._prices[:, positions])
+        valid_rows = ~np.isnan(values).all(axis=1)
+        return pd.DataFrame(values[valid_rows], index=self._index[valid_rows], columns=list(assets))
+
+    def write(self, prices: pd.DataFrame, sources: Dict[str, int] = None) -> None:
+        """
+        Escribe una matriz de precios en el almacén de forma atómica.
+
+        Los archivos de datos se escriben con un nombre nuevo y el manifiesto se reemplaza
+        al final, de modo que un lector nunca ve un almacén a medio escribir.
+        """
+        os.makedirs(self.store_dir, exist_ok=True)
+        previous = None
+        if self.exists():
+            with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                previous = json.load(f)
+
+        token = uuid.uuid4().hex[:12]
+        index_file = f"index-{token}.npy"
+        prices_file = f"prices-{token}.npy"
+        index = to_utc_index(prices.index)
+        np.save(os.path.join(self.store_dir, index_file), index.tz_convert(None).values.astype("datetime64[ns]"))
+        np.save(os.path.join(self.store_dir, prices_file), np.ascontiguousarray(prices.to_numpy(dtype=np.float64)))
+
+        manifest = {
+            "tickers": [str(column) for column in prices.columns],
+            "index_file": index_file,
+            "prices_file": prices_file,
+            "sources": sources or {},
+        }
+        tmp_path = self._manifest_path() + f".{token}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self._manifest_path())
+        print(f"Almacén de precios escrito en {self.store_dir}: {prices.shape[0]} filas, {prices.shape[1]} activos")
+
+        # Eliminar los archivos de la versión anterior
+        if previous is not None:
+            for key in ("index_file", "prices_file"):
+                old_path = os.path.join(self.store_dir, previous[key])
+                if previous[key] != manifest[key] and os.path.isfile(old_path):
+                    try:
+                        os.remove(old_path)
+                    except OSError:
+                        pass  # Otro proceso puede tenerlo abierto (Windows)
+
+    @classmethod
+    def from_csv_dir(cls, data_dir: str, store_dir: str = None, assets: List[str] = None) -> "PriceStore":
+        """
+        Importa al almacén los CSV existentes (un archivo <TICKER>.csv por activo).
+
+        Args:
+            data_dir: Carpeta con los CSV descargados por DataLoader.
+            store_dir: Carpeta del almacén (por defecto <data_dir>/store).
+            assets: Activos a importar (por defecto todos los CSV de la carpeta).
+        """
+        store_dir = store_dir or os.path.join(data_dir, "store")
+        if assets is None:
+            assets = sorted(name[:-4] for name in os.listdir(data_dir) if name.endswith(".csv"))
+
+        columns, sources = [], {}
+        for asset in assets:
+            file_path = os.path.join(data_dir, f"{asset}.csv")
+            df = pd.read_csv(file_path, index_col=0)
+            df.index = to_utc_index(df.index)
+            columns.append(df.iloc[:, 0].rename(asset))
+            sources[asset] = os.stat(file_path).st_mtime_ns
+
+        prices = pd.concat(columns, axis=1, sort=True) if columns else pd.DataFrame()
+        store = cls(store_dir)
+        store.write(prices, sources)
+        return store
+
+
+if __name__ == "__main__":
+    # Uso: python price_store.py [carpeta_de_datos] [carpeta_del_almacen]
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else "data"
+    store_dir = sys.argv[2] if len(sys.argv) > 2 else None
+    PriceStore.from_csv_dir(data_dir, store_dir)
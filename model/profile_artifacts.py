@@ -0,0 +1,70 @@
+import os
+import uuid
+import pickle
+from typing import Dict, Optional
+
+# Ruta por defecto del artefacto con los perfiles precalculados
+PROFILES_FILE = os.path.join("artifacts", "profiles.pkl")
+
+# Artefactos ya leídos en este proceso, por ruta: (mtime, contenido)
+_loaded: Dict[str, tuple] = {}
+
+
+def compact_results(results: Dict[str, Dict]) -> Dict[str, Dict]:
+    """
+    Versión compacta de los resultados de compute_analysis para guardarlos en disco.
+
+    Las proyecciones a 3 y 5 años son los primeros días de la de 10 años (la misma
+    trayectoria y la misma inversión), así que por portafolio solo se guarda la más
+    larga y el resumen de cada horizonte.
+    """
+    compact = {}
+    for portfolio_name, result in results.items():
+        predictions = result['predictions']
+        longest = max(predictions)
+        compact[portfolio_name] = {
+            **{key: value for key, value in result.items() if key != 'predictions'},
+            'projection': predictions[longest]['predictions'],
+            'summary': {
+                years: {key: value for key, value in summary.items() if key != 'predictions'}
+                for years, summary in predictions.items()
+            }
+        }
+    return compact
+
+
+def expand_results(compact: Dict[str, Dict]) -> Dict[str, Dict]:
+    """Reconstruye el formato de compute_analysis a partir de compact_results."""
+    results = {}
+    for portfolio_name, entry in compact.items():
+        projection = entry['projection']
+        results[portfolio_name] = {
+            **{key: value for key, value in entry.items() if key not in ('projection', 'summary')},
+            'predictions': {
+                years: {'predictions': projection.iloc[:years * 252], **summary}
+                for years, summary in entry['summary'].items()
+            }
+        }
+    return results
+
+
+def save_profiles(artifact: Dict, path: str = PROFILES_FILE) -> str:
+    """Guarda el artefacto de forma atómica (archivo temporal y os.replace)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_profiles(path: str = PROFILES_FILE) -> Optional[Dict]:
+    """Artefacto de perfiles precalculados, o None si no existe. Se relee solo si cambió."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if path not in _loaded or _loaded[path][0] != mtime:
+        with open(path, "rb") as f:
+            _loaded[path] = (mtime, pickle.load(f))
+    return _loaded[path][1]
@@ -1,6 +1,102 @@
+import os
+import json
+import time
+import pandas as pd
 import yfinance as yf
+from typing import Dict, Optional, Tuple
 
-def get_average_risk_free_rate(start_date="2017-11-09", end_date="2024-10-31"):
-    data = yf.download("^TNX", start=start_date, end=end_date)
-    average_rate = data['Close'].mean() / 100
-    return average_rate
\ No newline at end of file
+RISK_FREE_TICKER = "^TNX"
+DATA_DIR = "data"  # Misma carpeta por defecto que DataLoader
+CACHE_FILE = "risk_free_cache.json"
+CACHE_TTL = 24 * 60 * 60  # Segundos que es válida una tasa descargada
+
+# Tasas ya calculadas en este proceso, por (carpeta, inicio, fin): (tasa, hora, versión del CSV)
+_rate_cache: Dict[Tuple[str, str, str], Tuple[float, float, Optional[int]]] = {}
+
+
+def _average_rate(close) -> float:
+    """Promedio del rendimiento del bono a 10 años, expresado como tasa decimal."""
+    if isinstance(close, pd.DataFrame):
+        close = close.iloc[:, 0]
+    return float(close.mean()) / 100
+
+
+def _rate_from_csv(start_date: str, end_date: str, data_dir: str) -> Optional[float]:
+    """Calcula la tasa desde el CSV de ^TNX que guarda DataLoader, si cubre el período."""
+    file_path = os.path.join(data_dir, f"{RISK_FREE_TICKER}.csv")
+    if not os.path.isfile(file_path):
+        return None
+    data = pd.read_csv(file_path, index_col=0)
+    dates = pd.to_datetime(data.index, utc=True).tz_convert(None).normalize()
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    # Se admite una semana de margen por fines de semana y feriados en los extremos
+    margin = pd.Timedelta(days=7)
+    if dates.empty or dates.min() > start + margin or dates.max() < end - margin:
+        return None
+    in_range = (dates >= start) & (dates < end)
+    return _average_rate(data.loc[in_range].iloc[:, 0])
+
+
+def _csv_version(data_dir: str) -> Optional[int]:
+    """Fecha de modificación del CSV de ^TNX, o None si no existe."""
+    try:
+        return os.stat(os.path.join(data_dir, f"{RISK_FREE_TICKER}.csv")).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _read_disk_cache(cache_path: str) -> Dict:
+    if not os.path.isfile(cache_path):
+        return {}
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_disk_cache(cache_path: str, key: str, rate: float) -> None:
+    cache = _read_disk_cache(cache_path)
+    cache[key] = {"rate": rate, "timestamp": time.time()}
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_path, cache_path)
+
+
+def get_average_risk_free_rate(start_date="2017-11-09", end_date="2024-10-31", data_dir=DATA_DIR,
+                               ttl=CACHE_TTL, use_cache=True):
+    """
+    Devuelve la tasa libre de riesgo promedio (^TNX) para un período.
+
+    Busca la tasa en este orden: memoria del proceso, CSV de ^TNX guardado por DataLoader,
+    caché en disco (válida por ttl segundos) y, solo si nada de lo anterior está
+    disponible, descarga desde Yahoo Finance.
+
+    La memoria del proceso se separa por carpeta de datos y vence igual que la caché en
+    disco (ttl), o antes si el CSV de ^TNX cambió (por ejemplo, con una descarga incremental).
+    """
+    key = (os.path.abspath(data_dir), start_date, end_date)
+    csv_version = _csv_version(data_dir)
+    if use_cache and key in _rate_cache:
+        rate, timestamp, cached_version = _rate_cache[key]
+        if time.time() - timestamp < ttl and cached_version == csv_version:
+            return rate
+
+    rate = _rate_from_csv(start_date, end_date, data_dir) if use_cache else None
+
+    cache_path = os.path.join(data_dir, CACHE_FILE)
+    disk_key = f"{start_date}|{end_date}"
+    if rate is None and use_cache:
+        entry = _read_disk_cache(cache_path).get(disk_key)
+        if entry is not None and time.time() - entry["timestamp"] < ttl:
+            rate = entry["rate"]
+
+    if rate is None:
+        data = yf.download(RISK_FREE_TICKER, start=start_date, end=end_date)
+        rate = _average_rate(data['Close'])
+        os.makedirs(data_dir, exist_ok=True)
+        _write_disk_cache(cache_path, disk_key, rate)
+
+    _rate_cache[key] = (rate, time.time(), csv_version)
+    return rate
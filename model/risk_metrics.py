@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from typing import Callable
+
+
+def portfolio_returns_matrix(returns: np.array, weights: np.array) -> np.array:
+    """Retornos diarios de M portafolios a la vez: (días, N) @ (N, M) -> (días, M)."""
+    return np.asarray(returns, dtype=np.float64) @ np.atleast_2d(np.asarray(weights, dtype=np.float64)).T
+
+
+def historical_var_cvar(portfolio_returns: np.array, confidence: float = 0.95):
+    """
+    VaR y CVaR históricos de cada columna, como pérdidas positivas.
+
+    El VaR es el cuantil 1 - confidence de los retornos y el CVaR el promedio de los
+    retornos iguales o peores que ese cuantil.
+    """
+    quantiles = np.quantile(portfolio_returns, 1 - confidence, axis=0)
+    tail = portfolio_returns <= quantiles
+    cvar = -(portfolio_returns * tail).sum(axis=0) / tail.sum(axis=0)
+    return -quantiles, cvar
+
+
+def parametric_var_cvar(means: np.array, volatilities: np.array, confidence: float = 0.95):
+    """VaR y CVaR suponiendo retornos normales con esas medias y volatilidades."""
+    z = norm.ppf(1 - confidence)
+    var = -(means + z * volatilities)
+    cvar = -(means - volatilities * norm.pdf(z) / (1 - confidence))
+    return var, cvar
+
+
+def drawdowns(portfolio_returns: np.array) -> np.array:
+    """Caída de la curva de valor desde su último pico, día a día (mismo tamaño que los retornos)."""
+    equity = np.cumprod(1 + np.asarray(portfolio_returns, dtype=np.float64), axis=0)
+    # El capital inicial (1) cuenta como primer pico
+    peaks = np.maximum(np.maximum.accumulate(equity, axis=0), 1.0)
+    return equity / peaks - 1
+
+
+def max_drawdowns(portfolio_returns: np.array) -> np.array:
+    """Máxima caída desde un pico de la curva de valor de cada columna (números negativos)."""
+    if len(portfolio_returns) == 0:
+        return np.zeros(np.shape(portfolio_returns)[1:])
+    return np.minimum(drawdowns(portfolio_returns).min(axis=0), 0.0)
+
+
+def risk_report(returns, weights: np.array, confidence: float = 0.95, risk_free_rate: float = 0.0,
+                cov_matvec: Callable[[np.array], np.array] = None, chunk_size: int = 2000) -> pd.DataFrame:
+    """
+    Métricas de riesgo de muchos portafolios en una sola llamada.
+
+    Los retornos de todos los portafolios salen de un producto matricial retornos @ pesosᵀ,
+    por bloques de chunk_size portafolios para acotar la memoria a días × chunk_size.
+
+    Args:
+        returns: Retornos diarios de los activos (días, N), DataFrame o arreglo.
+        weights: Pesos (N,) de un portafolio o (M, N) de M portafolios.
+        confidence: Nivel de confianza del VaR y el CVaR.
+        risk_free_rate: Tasa libre de riesgo anual (también es el retorno mínimo del Sortino).
+        cov_matvec: Función W -> Σ·W con la covarianza diaria para el VaR paramétrico
+                    (por defecto, la covarianza muestral de los retornos).
+        chunk_size: Portafolios por bloque.
+
+    Returns:
+        pd.DataFrame: Una fila por portafolio con VaR y CVaR diarios (históricos y
+                      paramétricos, como pérdidas positivas), 'annual_return',
+                      'annual_volatility', 'max_drawdown', 'sortino_ratio' y 'calmar_ratio'.
+    """
+    values = returns.to_numpy(dtype=np.float64) if isinstance(returns, pd.DataFrame) else np.asarray(returns, dtype=np.float64)
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    n_days = len(values)
+    if cov_matvec is None:
+        cov_matrix = np.atleast_2d(np.cov(values, rowvar=False))
+        cov_matvec = cov_matrix.__matmul__
+    daily_rf = risk_free_rate / 252
+
+    blocks = []
+    for start in range(0, len(weights), chunk_size):
+        block = weights[start:start + chunk_size]
+        portfolio_returns = portfolio_returns_matrix(values, block)
+        means = portfolio_returns.mean(axis=0)
+        volatilities = np.sqrt(np.sum(block.T * cov_matvec(block.T), axis=0))
+        var_hist, cvar_hist = historical_var_cvar(portfolio_returns, confidence)
+        var_param, cvar_param = parametric_var_cvar(means, volatilities, confidence)
+
+        downside = np.sqrt(np.mean(np.minimum(portfolio_returns - daily_rf, 0) ** 2, axis=0)) * np.sqrt(252)
+        drawdown = max_drawdowns(portfolio_returns)
+        growth = np.prod(1 + portfolio_returns, axis=0)
+        cagr = growth ** (252 / n_days) - 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sortino = (means * 252 - risk_free_rate) / downside
+            calmar = cagr / -drawdown
+        blocks.append(pd.DataFrame({
+            'var_historical': var_hist,
+            'cvar_historical': cvar_hist,
+            'var_parametric': var_param,
+            'cvar_parametric': cvar_param,
+            'annual_return': means * 252,
+            'annual_volatility': volatilities * np.sqrt(252),
+            'max_drawdown': drawdown,
+            'sortino_ratio': sortino,
+            'calmar_ratio': calmar
+        }))
+    return pd.concat(blocks, ignore_index=True)
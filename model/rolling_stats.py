@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Sequence
+
+
+class RollingStatistics:
+    """
+    Media y covarianza de una ventana móvil de retornos, actualizadas día a día.
+
+    Guarda la suma de los retornos y la suma de sus productos cruzados de la ventana: al
+    entrar un día nuevo se suma su producto externo y se resta el del día que sale, O(N²)
+    por día en lugar de O(ventana · N²) por recalcular la ventana completa. Los retornos
+    se centran en una media de referencia para no perder precisión al restar sumas grandes.
+    """
+
+    def __init__(self, window: int, n_assets: int, center: np.array = None):
+        if window < 2:
+            raise ValueError("La ventana debe tener al menos 2 días.")
+        self.window = window
+        self.n_assets = n_assets
+        self.center = np.zeros(n_assets) if center is None else np.asarray(center, dtype=np.float64)
+        self._buffer = np.zeros((window, n_assets))  # Últimos `window` retornos centrados
+        self._sum = np.zeros(n_assets)
+        self._cross = np.zeros((n_assets, n_assets))
+        self.count = 0
+
+    @property
+    def ready(self) -> bool:
+        """True cuando la ventana ya está completa."""
+        return self.count >= self.window
+
+    def push(self, returns: np.array) -> None:
+        """Agrega los retornos de un día y descarta el día más antiguo de la ventana."""
+        new = np.asarray(returns, dtype=np.float64) - self.center
+        slot = self.count % self.window
+        if self.count >= self.window:
+            old = self._buffer[slot]
+            self._sum -= old
+            self._cross -= np.outer(old, old)
+        self._buffer[slot] = new
+        self._sum += new
+        self._cross += np.outer(new, new)
+        self.count += 1
+
+    def mean(self) -> np.array:
+        """Retorno medio diario de la ventana."""
+        n = min(self.count, self.window)
+        return self.center + self._sum / n
+
+    def covariance(self) -> np.array:
+        """Matriz de covarianza diaria (muestral) de la ventana."""
+        n = min(self.count, self.window)
+        if n < 2:
+            raise ValueError("Se necesitan al menos 2 días para la covarianza.")
+        return (self._cross - np.outer(self._sum, self._sum) / n) / (n - 1)
+
+
+def correlation_from_covariance(cov: np.array) -> np.array:
+    """Correlaciones a partir de una o varias matrices de covarianza (..., N, N)."""
+    std = np.sqrt(np.diagonal(cov, axis1=-2, axis2=-1))
+    return cov / (std[..., :, None] * std[..., None, :])
+
+
+def rolling_covariances(returns: np.array, window: int, dtype=np.float64) -> np.array:
+    """
+    Covarianzas diarias de todas las ventanas móviles, en un arreglo (días - window + 1, N, N).
+
+    La fila k corresponde a la ventana que termina en el día window - 1 + k. Con
+    dtype=np.float32 el arreglo ocupa la mitad (el cálculo se hace igual en float64).
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n_days, n_assets = returns.shape
+    if n_days < window:
+        return np.empty((0, n_assets, n_assets), dtype=dtype)
+    stats = RollingStatistics(window, n_assets, center=returns.mean(axis=0))
+    covariances = np.empty((n_days - window + 1, n_assets, n_assets), dtype=dtype)
+    for t in range(n_days):
+        stats.push(returns[t])
+        if stats.ready:
+            covariances[t - window + 1] = stats.covariance()
+    return covariances
+
+
+def rolling_metrics(returns: pd.DataFrame, windows: Sequence[int] = (30, 90, 252), risk_free_rate: float = 0.0,
+                    weights: np.array = None, dtype=np.float64) -> Dict[int, Dict]:
+    """
+    Volatilidad, Sharpe y correlaciones móviles anualizadas para varios tamaños de ventana.
+
+    Args:
+        returns: Retornos diarios (días, activos).
+        windows: Tamaños de ventana en días.
+        risk_free_rate: Tasa libre de riesgo anual.
+        weights: Pesos del portafolio; si se indican, también se calcula su volatilidad y Sharpe.
+        dtype: Tipo de los arreglos de covarianza y correlación.
+
+    Returns:
+        Dict[int, Dict]: Por ventana, 'dates' (fin de cada ventana), 'volatility' y 'sharpe'
+                         (DataFrames por activo), 'covariance' y 'correlation' (arreglos 3-D
+                         anualizados / sin unidad) y opcionalmente 'portfolio_volatility' y
+                         'portfolio_sharpe' (Series).
+    """
+    values = returns.to_numpy(dtype=np.float64)
+    # Medias móviles con una suma acumulada (O(1) por día y ventana)
+    cumulative = np.vstack([np.zeros(values.shape[1]), np.cumsum(values, axis=0)])
+    results = {}
+    for window in windows:
+        covariances = rolling_covariances(values, window)
+        dates = returns.index[window - 1:]
+        means = (cumulative[window:] - cumulative[:-window]) / window * 252
+
+        covariances *= 252
+        volatility = np.sqrt(np.diagonal(covariances, axis1=1, axis2=2))
+        result = {
+            'dates': dates,
+            'volatility': pd.DataFrame(volatility, index=dates, columns=returns.columns),
+            'sharpe': pd.DataFrame((means - risk_free_rate) / volatility, index=dates, columns=returns.columns),
+            'covariance': covariances.astype(dtype, copy=False),
+            'correlation': correlation_from_covariance(covariances).astype(dtype, copy=False)
+        }
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)
+            portfolio_vol = np.sqrt(np.einsum('i,kij,j->k', weights, covariances, weights))
+            result['portfolio_volatility'] = pd.Series(portfolio_vol, index=dates)
+            result['portfolio_sharpe'] = pd.Series((means @ weights - risk_free_rate) / portfolio_vol, index=dates)
+        results[window] = result
+    return results
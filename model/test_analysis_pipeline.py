@@ -0,0 +1,146 @@
+# test_analysis_pipeline.py
+import os
+import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import analysis_pipeline
+from analysis_pipeline import AnalysisPipeline, allocation_key
+from benchmark_optimizacion import generar_precios
+from model_cache import get_model_cache
+
+PORTAFOLIOS = {"A": ["A0", "A1", "A2"], "B": ["A3", "A4", "A5"]}
+
+
+def crear_datos(data_dir):
+    """CSV de precios sintéticos y de ^TNX, para no acceder a la red."""
+    os.makedirs(data_dir, exist_ok=True)
+    prices = generar_precios(6, n_days=300)
+    for asset in prices.columns:
+        prices[[asset]].rename_axis("Date").to_csv(os.path.join(data_dir, f"{asset}.csv"))
+    dates = pd.bdate_range("2017-11-01", "2024-11-05")
+    pd.DataFrame({"^TNX": np.full(len(dates), 3.0)}, index=pd.Index(dates, name="Date")).to_csv(
+        os.path.join(data_dir, "^TNX.csv"))
+
+
+def test_allocation_key_ignores_order_and_empty_sleeves():
+    assert allocation_key({"A": 0.5, "B": 0.5, "C": 0}) == allocation_key({"B": 0.5, "A": 0.5})
+    assert allocation_key({"A": 0.5, "B": 0.5}) != allocation_key({"A": 0.6, "B": 0.4})
+
+
+def test_repeated_requests_are_served_from_memory():
+    """La misma asignación devuelve los resultados guardados hasta que cambian los datos."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            crear_datos("data")
+            pipeline = AnalysisPipeline(data_dir="data", portfolios=PORTAFOLIOS)
+            assert pipeline.alignment == "intersect"
+            first = pipeline.run({"A": 0.7, "B": 0.3})
+            assert set(first) == {"A", "B"}
+            assert set(first["A"]["predictions"]) == {3, 5, 10}
+            assert first["A"]["predictions"][3]["initial_value"] == 70000
+
+            assert pipeline.run({"B": 0.3, "A": 0.7}) is first
+            other = pipeline.run({"A": 1.0, "B": 0})
+            assert other is not first and set(other) == {"A"}
+
+            # Un CSV actualizado invalida la caché sin limpiarla a mano
+            file_path = os.path.join("data", "A0.csv")
+            stat = os.stat(file_path)
+            os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            refreshed = pipeline.run({"A": 0.7, "B": 0.3})
+            assert refreshed is not first
+            np.testing.assert_allclose(refreshed["A"]["optimal_weights"]["weights"],
+                                       first["A"]["optimal_weights"]["weights"])
+        finally:
+            os.chdir(cwd)
+            get_model_cache().clear()
+
+
+def test_empty_sleeves_are_reported_as_warnings():
+    """Un portafolio seleccionado sin datos se omite y se informa en results.warnings."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            crear_datos("data")
+            portfolios = {**PORTAFOLIOS, "C": []}
+            pipeline = AnalysisPipeline(data_dir="data", portfolios=portfolios)
+            results = pipeline.run({"A": 0.8, "C": 0.2})
+            assert set(results) == {"A"}
+            assert results.warnings == ["No data available for C portfolio"]
+            assert pipeline.run({"C": 0.2, "A": 0.8}).warnings == results.warnings
+            assert pipeline.run({"A": 1.0}).warnings == []
+        finally:
+            os.chdir(cwd)
+            get_model_cache().clear()
+
+
+def test_sleeve_projection_does_not_depend_on_other_sleeves():
+    """La proyección de un portafolio es la misma con cualquier combinación de los demás."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            crear_datos("data")
+            pipeline = AnalysisPipeline(data_dir="data", portfolios=PORTAFOLIOS)
+            alone = pipeline.run({"B": 1.0})
+            together = pipeline.run({"A": 0.5, "B": 0.5})
+            expected = alone["B"]["predictions"][10]["predictions"]["Predicted_Return"]
+            projected = together["B"]["predictions"][10]["predictions"]["Predicted_Return"]
+            np.testing.assert_array_equal(projected, expected)
+            assert not np.array_equal(together["A"]["predictions"][10]["predictions"]["Predicted_Return"],
+                                      expected)
+        finally:
+            os.chdir(cwd)
+            get_model_cache().clear()
+
+
+def test_cold_key_does_not_block_other_keys():
+    """Un cálculo en curso no bloquea los aciertos de otras claves y no se repite para la suya."""
+    cwd = os.getcwd()
+    original = analysis_pipeline.compute_analysis
+    release = threading.Event()
+    calls = []
+
+    def slow_analysis(portfolio_data, portfolio_allocation, investment_total=100000, progress=None):
+        calls.append(allocation_key(portfolio_allocation))
+        if portfolio_allocation.get("B"):
+            assert release.wait(10)
+        return {name: {"allocation": weight} for name, weight in portfolio_allocation.items()}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        analysis_pipeline.compute_analysis = slow_analysis
+        try:
+            crear_datos("data")
+            pipeline = AnalysisPipeline(data_dir="data", portfolios=PORTAFOLIOS)
+            cached = pipeline.run({"A": 1.0})
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                cold = [pool.submit(pipeline.run, {"A": 0.5, "B": 0.5}) for _ in range(2)]
+                while len(calls) < 2:
+                    time.sleep(0.01)
+                # Con el cálculo frío en curso, la clave ya calculada responde al instante
+                assert pool.submit(pipeline.run, {"A": 1.0}).result(timeout=2) is cached
+                release.set()
+                first, second = [future.result(timeout=10) for future in cold]
+            assert first is second
+            assert calls.count(allocation_key({"A": 0.5, "B": 0.5})) == 1
+            assert not pipeline._pending
+        finally:
+            release.set()
+            analysis_pipeline.compute_analysis = original
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    test_allocation_key_ignores_order_and_empty_sleeves()
+    test_repeated_requests_are_served_from_memory()
+    test_empty_sleeves_are_reported_as_warnings()
+    test_sleeve_projection_does_not_depend_on_other_sleeves()
+    test_cold_key_does_not_block_other_keys()
+    print("\n=== Todas las pruebas completadas exitosamente ===")
@@ -0,0 +1,61 @@
+# test_backtester.py
+import time
+import numpy as np
+from backtester import walk_forward_backtest, backtest_portfolios
+from portfolio_analysis import PortfolioAnalyzer
+from benchmark_optimizacion import generar_precios
+
+
+def backtest_con_bucle(prices, lookback, rebalance_every, risk_free_rate):
+    """Referencia: un analizador nuevo por rebalanceo y un bucle por día con pesos que derivan."""
+    returns = prices.pct_change().dropna()
+    values = returns.to_numpy()
+    realized, weights = [], None
+    for day in range(lookback, len(values)):
+        if (day - lookback) % rebalance_every == 0:
+            window = prices.iloc[day - lookback:day + 1]
+            weights = PortfolioAnalyzer(window, risk_free_rate=risk_free_rate).optimize_weights()['weights']
+        day_return = values[day] @ weights
+        realized.append(day_return)
+        weights = weights * (1 + values[day]) / (1 + day_return)
+    return np.array(realized)
+
+
+def test_walk_forward_matches_reference():
+    """Los retornos en bloque coinciden con reoptimizar y derivar los pesos día a día."""
+    prices = generar_precios(6, n_days=400)
+    result = walk_forward_backtest(prices, lookback=120, rebalance_every=30, risk_free_rate=0.02)
+    expected = backtest_con_bucle(prices, 120, 30, 0.02)
+    np.testing.assert_allclose(result['returns'].to_numpy(), expected, rtol=1e-5, atol=1e-8)
+
+    assert len(result['weights']) == len(range(120, len(prices) - 1, 30))
+    np.testing.assert_allclose(result['weights'].sum(axis=1), 1, atol=1e-6)
+    assert result['turnover'].iloc[0] == 1 and (result['turnover'].iloc[1:] < 2).all()
+    assert result['max_drawdown'] <= 0 and result['max_drawdown'] == result['drawdown'].min()
+
+    with_costs = walk_forward_backtest(prices, lookback=120, rebalance_every=30, risk_free_rate=0.02,
+                                       transaction_cost=0.001)
+    assert with_costs['equity'].iloc[-1] < result['equity'].iloc[-1]
+    # Cada rebalanceo paga costo × rotación, incluida la compra inicial (costo de entrada 0.001)
+    charged = result['returns'] - with_costs['returns']
+    expected_costs = (0.001 * result['turnover']).reindex(charged.index, fill_value=0.0)
+    np.testing.assert_allclose(charged.to_numpy(), expected_costs.to_numpy(), atol=1e-15)
+    assert abs(charged.iloc[0] - 0.001) < 1e-15
+
+
+def test_five_sleeves_full_history_in_seconds():
+    """Toda la historia 2017-2024 de cinco portafolios en unos segundos."""
+    sleeves = {f"P{i}": generar_precios(n_assets, n_days=1750, seed=i)
+               for i, n_assets in enumerate((4, 5, 7, 5, 5))}
+    start = time.perf_counter()
+    results = backtest_portfolios(sleeves, risk_free_rate=0.02)
+    elapsed = time.perf_counter() - start
+    assert set(results) == set(sleeves)
+    assert all(len(result['returns']) == 1749 - 252 for result in results.values())
+    assert elapsed < 10
+
+
+if __name__ == "__main__":
+    test_walk_forward_matches_reference()
+    test_five_sleeves_full_history_in_seconds()
+    print("\n=== Todas las pruebas completadas exitosamente ===")
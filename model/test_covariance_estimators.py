@@ -0,0 +1,68 @@
+# test_covariance_estimators.py
+import numpy as np
+from sklearn.covariance import LedoitWolf
+from covariance_estimators import estimate_covariance, FactorCovariance
+from portfolio_analysis import PortfolioAnalyzer
+from benchmark_optimizacion import generar_precios
+
+
+def test_estimators_match_references():
+    """Cada estimador coincide con su definición directa."""
+    returns = generar_precios(8, n_days=300).pct_change().dropna().to_numpy()
+    np.testing.assert_allclose(estimate_covariance(returns).to_dense(), np.cov(returns, rowvar=False))
+    np.testing.assert_allclose(estimate_covariance(returns, "ledoit_wolf").to_dense(),
+                               LedoitWolf().fit(returns).covariance_, rtol=1e-10)
+
+    decay = 0.9
+    weights = decay ** np.arange(len(returns))[::-1]
+    weights /= weights.sum()
+    ewma = estimate_covariance(returns, "ewma", decay=decay).to_dense()
+    centered = returns - weights @ returns
+    np.testing.assert_allclose(ewma, np.einsum('t,ti,tj->ij', weights, centered, centered), rtol=1e-10)
+
+    # Con todos los factores el modelo reproduce la covarianza muestral
+    full = estimate_covariance(returns, "factor", n_factors=8)
+    np.testing.assert_allclose(full.to_dense(), np.cov(returns, rowvar=False), atol=1e-12)
+
+
+def test_factor_model_products_are_low_rank():
+    """Σ·w del modelo de factores coincide con la matriz completa sin construirla."""
+    rng = np.random.default_rng(1)
+    model = FactorCovariance(rng.normal(size=(500, 4)), rng.uniform(0.5, 1, 4), rng.uniform(0.1, 0.2, 500))
+    dense = model.to_dense()
+    w, W = rng.normal(size=500), rng.normal(size=(500, 7))
+    np.testing.assert_allclose(model.matvec(w), dense @ w)
+    np.testing.assert_allclose(model.matvec(W), dense @ W)
+    np.testing.assert_allclose(model.diagonal(), np.diag(dense))
+    assert model.loadings.nbytes + model.specific_variances.nbytes < dense.nbytes / 50
+
+
+def test_analyzer_with_pluggable_estimators():
+    """El analizador optimiza y mide riesgo con cualquier estimador."""
+    prices = generar_precios(40, n_days=120)  # Casi tantos activos como días
+    for method, params in (("ledoit_wolf", None), ("ewma", {"decay": 0.97}), ("factor", {"n_factors": 3})):
+        analyzer = PortfolioAnalyzer(prices, risk_free_rate=0.02, covariance=method, covariance_params=params)
+        result = analyzer.optimize_weights(max_weight=0.1, min_weight=0.0)
+        assert result['success'] and abs(result['weights'].sum() - 1) < 1e-6
+        performance = analyzer.portfolio_performance(result['weights'])
+        expected_vol = np.sqrt(result['weights'] @ analyzer.cov_matrix @ result['weights'])
+        np.testing.assert_allclose(performance['volatility'], expected_vol, rtol=1e-10)
+        if method != "ewma":
+            # Mejor condicionada que la muestral con pocos días por activo
+            assert np.linalg.cond(analyzer.cov_matrix) < np.linalg.cond(np.cov(analyzer.returns.to_numpy(), rowvar=False))
+
+    frontier = PortfolioAnalyzer(prices, risk_free_rate=0.02, covariance="factor").efficient_frontier(
+        8, max_weight=0.1, min_weight=0.0)
+    assert frontier['success'].all()
+
+    updated = PortfolioAnalyzer(prices.iloc[:100], risk_free_rate=0.02, covariance="ledoit_wolf")
+    updated.update(prices.iloc[100:])
+    np.testing.assert_allclose(updated.cov_matrix, PortfolioAnalyzer(
+        prices, risk_free_rate=0.02, covariance="ledoit_wolf").cov_matrix, rtol=1e-10)
+
+
+if __name__ == "__main__":
+    test_estimators_match_references()
+    test_factor_model_products_are_low_rank()
+    test_analyzer_with_pluggable_estimators()
+    print("\n=== Todas las pruebas completadas exitosamente ===")
@@ -0,0 +1,271 @@
+# test_data_loader.py
+import os
+import time
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from data_loader import DataLoader
+from price_store import PriceStore
+from calendar_alignment import DEFAULT_ALIGNMENT
+
+
+def escribir_csv(data_dir, asset, index, values):
+    """Escribe un CSV con el mismo formato que guarda DataLoader."""
+    df = pd.DataFrame({asset: values}, index=pd.Index(index, name="Date"))
+    df.to_csv(os.path.join(data_dir, f"{asset}.csv"))
+
+
+def crear_datos(data_dir):
+    """Crea dos activos bursátiles (con cambio de horario) y una cripto."""
+    equity_dates = ["2024-03-08 00:00:00-05:00", "2024-03-11 00:00:00-04:00", "2024-03-12 00:00:00-04:00"]
+    crypto_dates = ["2024-03-08 00:00:00+00:00", "2024-03-09 00:00:00+00:00", "2024-03-10 00:00:00+00:00"]
+    escribir_csv(data_dir, "SPY", equity_dates, [510.0, 511.5, 509.0])
+    escribir_csv(data_dir, "QQQ", equity_dates, [440.0, 441.0, 445.5])
+    escribir_csv(data_dir, "BTC-USD", crypto_dates, [68000.0, 68500.0, 69000.0])
+
+
+def test_store_matches_csv():
+    """El almacén devuelve exactamente los mismos datos que los CSV."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        crear_datos(data_dir)
+        loader = DataLoader(data_dir=data_dir, use_store=False)
+        expected = loader.download_data(["SPY", "QQQ"])
+
+        loader = DataLoader(data_dir=data_dir)
+        loader.build_store()
+        assert loader.store.has_assets(["SPY", "QQQ", "BTC-USD"], data_dir)
+        result = loader.download_data(["SPY", "QQQ"])
+
+        np.testing.assert_array_equal(result.values, expected.values)
+        assert (result.index == expected.index).all()
+        assert list(result.columns) == ["SPY", "QQQ"]
+        # Sin filas vacías de las fechas que solo existen para la cripto
+        assert len(result) == 3
+
+
+def test_store_detects_stale_csv():
+    """Si un CSV cambia después de construir el almacén, se vuelve a leer el CSV."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        crear_datos(data_dir)
+        loader = DataLoader(data_dir=data_dir)
+        loader.build_store()
+
+        file_path = os.path.join(data_dir, "SPY.csv")
+        stat = os.stat(file_path)
+        os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert not loader.store.has_assets(["SPY"], data_dir)
+        assert loader.store.has_assets(["QQQ"], data_dir)
+
+        # Reconstruir reemplaza la versión anterior de forma atómica
+        loader.build_store()
+        assert loader.store.has_assets(["SPY"], data_dir)
+        assert len([f for f in os.listdir(loader.store.store_dir) if f.endswith(".npy")]) == 2
+        assert PriceStore(loader.store.store_dir).tickers == ["BTC-USD", "QQQ", "SPY"]
+
+
+class FakeProvider:
+    """Proveedor local que reemplaza a Yahoo Finance en las pruebas."""
+
+    def __init__(self, prices):
+        self.prices = prices  # {activo: DataFrame con columna 'Close'}
+        self.calls = []
+
+    def __call__(self, asset, start, end):
+        self.calls.append((asset, start, end))
+        df = self.prices[asset]
+        dates = df.index.tz_convert(None).normalize()
+        return df[(dates >= pd.Timestamp(start)) & (dates < pd.Timestamp(end))]
+
+
+def historial(n_days, start="2024-01-01"):
+    """Historial diario sintético con fechas en horario de Nueva York."""
+    index = pd.bdate_range(start, periods=n_days, tz="America/New_York", name="Date")
+    return pd.DataFrame({"Close": np.linspace(100.0, 100.0 + n_days, n_days)}, index=index)
+
+
+def test_incremental_download_fetches_only_missing_tail():
+    """El modo incremental pide solo las fechas nuevas y las agrega al CSV."""
+    full = historial(30)
+    with tempfile.TemporaryDirectory() as data_dir:
+        # Primera descarga con los primeros 25 días
+        first = FakeProvider({"SPY": full.iloc[:25]})
+        loader = DataLoader(end_date="2024-03-01", data_dir=data_dir, provider=first)
+        loader.download_data(["SPY"])
+        assert loader._last_stored_date("SPY") == full.index[24].tz_convert("UTC")
+
+        provider = FakeProvider({"SPY": full})
+        loader = DataLoader(end_date="2024-03-01", data_dir=data_dir, provider=provider)
+        result = loader.download_data(["SPY"], incremental=True)
+
+        # Solo se pidió la cola posterior a la última fecha guardada
+        assert provider.calls == [("SPY", (full.index[24] + pd.Timedelta(days=1)).strftime("%Y-%m-%d"), "2024-03-01")]
+        assert len(result) == 30
+        np.testing.assert_allclose(result["SPY"].values, full["Close"].values)
+        assert not any(name.endswith(".tmp") for name in os.listdir(data_dir))
+
+        # Una segunda actualización sin datos nuevos no modifica el archivo
+        assert loader.update_data("SPY") == 0
+        assert len(loader.download_data(["SPY"])) == 30
+
+
+class SlowFlakyProvider(FakeProvider):
+    """Proveedor con latencia simulada y fallos transitorios o permanentes."""
+
+    def __init__(self, prices, latency, transient_failures=None, broken=()):
+        super().__init__(prices)
+        self.latency = latency
+        self.transient_failures = dict(transient_failures or {})
+        self.broken = set(broken)
+        self.lock = threading.Lock()
+
+    def __call__(self, asset, start, end):
+        time.sleep(self.latency)
+        with self.lock:
+            if asset in self.broken:
+                raise ConnectionError(f"{asset} no disponible")
+            if self.transient_failures.get(asset, 0) > 0:
+                self.transient_failures[asset] -= 1
+                raise TimeoutError(f"timeout en {asset}")
+        return super().__call__(asset, start, end)
+
+
+def test_concurrent_fetch_with_retries_and_failures():
+    """La descarga en frío tarda lo que el activo más lento, no la suma de todos."""
+    assets = [f"A{i}" for i in range(12)]
+    prices = {asset: historial(10) for asset in assets}
+    provider = SlowFlakyProvider(prices, latency=0.2, transient_failures={"A3": 2}, broken=["A7"])
+    portfolios = {"P1": assets[:6], "P2": assets[4:]}
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        loader = DataLoader(end_date="2024-03-01", data_dir=data_dir, provider=provider,
+                            max_workers=12, max_retries=3, retry_backoff=0.01)
+        start = time.perf_counter()
+        portfolio_data = loader.process_portfolios(portfolios)
+        elapsed = time.perf_counter() - start
+
+        # 12 activos en secuencia tardarían más de 2.4 s; A3 necesita 3 intentos
+        assert elapsed < 1.5
+        assert list(loader.failures) == ["A7"]
+        assert "A7" not in portfolio_data["P2"].columns
+        assert list(portfolio_data["P1"].columns) == assets[:6]
+        # Cada activo se descargó una sola vez aunque A4 y A5 estén en los dos portafolios
+        assert sorted(call[0] for call in provider.calls) == sorted(a for a in assets if a != "A7")
+
+
+def test_retries_count_after_first_attempt():
+    """max_retries cuenta los reintentos: un activo roto se pide max_retries + 1 veces."""
+    provider = SlowFlakyProvider({}, latency=0, broken=["A0"])
+    calls = []
+
+    def local_history(asset, start, end):
+        calls.append(asset)
+        return provider(asset, start, end)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        loader = DataLoader(end_date="2024-03-01", data_dir=data_dir, provider=local_history,
+                            max_retries=2, retry_backoff=0.001)
+        assert loader.provider_name == "local_history"
+        assert list(loader.fetch_assets(["A0"])) == ["A0"]
+        assert calls == ["A0"] * 3
+        assert DataLoader(data_dir=data_dir).provider_name == "Yahoo Finance"
+
+
+def test_empty_download_is_reported_as_failure():
+    """Un ticker desconocido llega vacío (como en yfinance) y queda en failures, sin CSV."""
+    provider = FakeProvider({"SPY": historial(10), "XXXX": historial(10).iloc[:0]})
+    with tempfile.TemporaryDirectory() as data_dir:
+        loader = DataLoader(end_date="2024-03-01", data_dir=data_dir, provider=provider, alignment=None)
+        portfolio_data = loader.process_portfolios({"ETFs": ["SPY"], "Raros": ["XXXX"]})
+        assert list(loader.failures) == ["XXXX"]
+        assert "No se encontraron datos para XXXX" in loader.failures["XXXX"]
+        assert not os.path.exists(os.path.join(data_dir, "XXXX.csv"))
+        assert portfolio_data["Raros"].empty and len(portfolio_data["ETFs"]) == 10
+
+
+def test_overlapping_portfolios_share_one_matrix():
+    """Los activos compartidos se leen una vez y los portafolios son vistas de la misma matriz."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        crear_datos(data_dir)
+        loader = DataLoader(data_dir=data_dir, alignment=None)
+        loaded = []
+        original = loader._load_existing_data
+        loader._load_existing_data = lambda asset: loaded.append(asset) or original(asset)
+
+        portfolios = {"ETFs": ["SPY", "QQQ"], "Mixto": ["QQQ", "SPY"], "Cripto": ["BTC-USD"]}
+        portfolio_data = loader.process_portfolios(portfolios)
+
+        assert sorted(loaded) == ["BTC-USD", "QQQ", "SPY"]
+        assert list(portfolio_data["Mixto"].columns) == ["QQQ", "SPY"]
+        expected = DataLoader(data_dir=data_dir, use_store=False).download_data(["SPY", "QQQ"])
+        np.testing.assert_array_equal(portfolio_data["ETFs"].values, expected.values)
+        assert (portfolio_data["ETFs"].index == expected.index).all()
+
+        # En la matriz sin alinear la cripto agrega filas sin precios de acciones: se copian las válidas
+        assert not np.shares_memory(portfolio_data["ETFs"].to_numpy(), loader.price_matrix.to_numpy())
+        assert portfolio_data["ETFs"].notna().any(axis=1).all()
+
+        # Con un calendario común las vistas no copian los precios
+        equities = loader.build_price_matrix(["SPY", "QQQ"])
+        view = loader.portfolio_view(["QQQ"], equities)
+        assert np.shares_memory(view.to_numpy(), equities.to_numpy())
+
+
+def test_default_alignment_gives_dense_views():
+    """Por defecto los portafolios salen de la matriz 'intersect', como vistas sin copia."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        crear_datos(data_dir)
+        loader = DataLoader(data_dir=data_dir)
+        assert loader.alignment == DEFAULT_ALIGNMENT == "intersect"
+        portfolio_data = loader.process_portfolios({"Acciones": ["SPY", "QQQ"], "Cripto": ["BTC-USD"]})
+        intersect = loader.aligned_matrix(policy="intersect")
+        for data in portfolio_data.values():
+            assert list(data.index) == [pd.Timestamp("2024-03-08")]
+            assert np.shares_memory(data.to_numpy(), intersect.to_numpy())
+
+
+def test_calendar_alignment_policies():
+    """Cada política da una matriz densa; la cripto y las acciones comparten el mismo día."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        crear_datos(data_dir)
+        loader = DataLoader(data_dir=data_dir)
+        portfolios = {"Acciones": ["SPY", "QQQ"], "Cripto": ["BTC-USD"]}
+        portfolio_data = loader.process_portfolios(portfolios, alignment="business_days")
+
+        intersect = loader.aligned_matrix(policy="intersect")
+        assert list(intersect.index) == [pd.Timestamp("2024-03-08")]
+
+        ffill = loader.aligned_matrix(policy="ffill")
+        assert len(ffill) == 5 and not ffill.isna().any().any()
+        assert ffill.loc["2024-03-10", "SPY"] == 510.0
+
+        business_days = loader.aligned_matrix(policy="business_days")
+        assert list(business_days.index) == list(pd.to_datetime(["2024-03-08", "2024-03-11", "2024-03-12"]))
+        # El movimiento del fin de semana de la cripto queda en el lunes
+        assert business_days.loc["2024-03-11", "BTC-USD"] == 69000.0
+        assert loader.aligned_matrix(policy="business_days") is business_days
+
+        # Los portafolios son vistas sin copia de la matriz alineada
+        assert list(portfolio_data["Cripto"].index) == list(business_days.index)
+        for data in portfolio_data.values():
+            assert np.shares_memory(data.to_numpy(), business_days.to_numpy())
+            assert len(data.pct_change().dropna()) == len(business_days) - 1
+
+        try:
+            loader.aligned_matrix(policy="weekly")
+            assert False, "Debía rechazar la política"
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    test_store_matches_csv()
+    test_store_detects_stale_csv()
+    test_incremental_download_fetches_only_missing_tail()
+    test_concurrent_fetch_with_retries_and_failures()
+    test_retries_count_after_first_attempt()
+    test_empty_download_is_reported_as_failure()
+    test_overlapping_portfolios_share_one_matrix()
+    test_default_alignment_gives_dense_views()
+    test_calendar_alignment_policies()
+    print("\n=== Todas las pruebas completadas exitosamente ===")
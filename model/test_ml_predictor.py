@@ -0,0 +1,135 @@
+# test_ml_predictor.py
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingRegressor
+from ml_predictor import PortfolioPredictor
+from benchmark_optimizacion import generar_precios
+
+
+def prepare_data_con_bucle(predictor, window_size=30):
+    """Implementación original con un bucle por día, usada como referencia."""
+    if predictor.weights is not None:
+        portfolio_returns = (predictor.data.pct_change() * predictor.weights).sum(axis=1)
+    else:
+        portfolio_returns = predictor.data.sum(axis=1)
+    X, y = [], []
+    for i in range(window_size, len(portfolio_returns)):
+        X.append(portfolio_returns.iloc[i - window_size:i].values)
+        y.append(portfolio_returns.iloc[i])
+    return np.array(X), np.array(y)
+
+
+def test_vectorized_windows_are_bit_identical():
+    """Las ventanas vectorizadas son idénticas bit a bit a las del bucle original."""
+    prices = generar_precios(5, n_days=300)
+    for weights in (np.array([0.1, 0.2, 0.3, 0.25, 0.15]), None):
+        data = prices if weights is not None else prices.pct_change().dropna()
+        predictor = PortfolioPredictor(data, weights)
+        windows = predictor.prepare_windows([5, 30, 60])
+        for window_size in (5, 30, 60):
+            expected_X, expected_y = prepare_data_con_bucle(predictor, window_size)
+            X, y = predictor.prepare_data(window_size)
+            assert X.shape == expected_X.shape and X.dtype == expected_X.dtype
+            assert np.array_equal(X, expected_X) and np.array_equal(y, expected_y)
+            assert np.array_equal(windows[window_size][0], expected_X)
+            assert np.array_equal(windows[window_size][1], expected_y)
+
+
+class ModeloContador:
+    """Envuelve un modelo y cuenta las filas que predice."""
+
+    def __init__(self, model):
+        self.model = model
+        self.rows = 0
+
+    def predict(self, X):
+        self.rows += len(X)
+        return self.model.predict(X)
+
+
+def predictor_entrenado(n_assets=4, seed=0):
+    """Predictor con un modelo pequeño entrenado sobre datos sintéticos."""
+    prices = generar_precios(n_assets, n_days=400, seed=seed)
+    predictor = PortfolioPredictor(prices, np.full(n_assets, 1.0 / n_assets))
+    X, y = predictor.prepare_data()
+    model = HistGradientBoostingRegressor(max_iter=10, max_depth=4, random_state=42).fit(X, y)
+    return predictor, model
+
+
+def test_multi_horizon_reuses_one_path():
+    """Los horizontes salen de una sola trayectoria e igualan a predict_returns."""
+    predictor, model = predictor_entrenado()
+    predictor.model = ModeloContador(model)
+    horizons = predictor.predict_horizons([1000.0, 2500.0], [1, 2, 3])
+    assert predictor.model.rows == 3 * 252
+
+    reference, _ = predictor_entrenado()
+    reference.model = model
+    for years in (1, 2, 3):
+        expected = reference.predict_returns(1000.0, years)
+        assert horizons[1000.0][years].equals(expected)
+        np.testing.assert_allclose(horizons[2500.0][years]['Portfolio_Value'], 2.5 * expected['Portfolio_Value'])
+
+    # Pedir horizontes ya simulados no vuelve a llamar al modelo
+    predictor.predict_returns(500.0, 2)
+    single = predictor.predict_horizons(500.0, [3])
+    assert set(single) == {3}
+    assert predictor.model.rows == 3 * 252
+
+
+def test_batched_forecast_matches_single_paths():
+    """Simular varias trayectorias juntas da lo mismo que el bucle original con np.roll."""
+    predictors = []
+    for seed in range(3):
+        predictor, model = predictor_entrenado(seed=seed)
+        predictors.append(predictor)
+    shared = ModeloContador(model)
+    for predictor in predictors:
+        predictor.model = shared
+    predictors[1]._simulate_path(10)  # Una trayectoria ya empezada
+
+    PortfolioPredictor.simulate_batch(predictors, 60)
+    # 60 pasos en bloque más los 10 ya simulados, no 3 * 60
+    assert shared.rows == 10 + 3 * 60
+
+    for predictor in predictors:
+        current_window = predictor.prepare_data()[0][-1]
+        expected = []
+        for _ in range(60):
+            pred = model.predict(current_window.reshape(1, -1))[0]
+            expected.append(pred)
+            current_window = np.roll(current_window, -1)
+            current_window[-1] = pred
+        np.testing.assert_allclose(predictor.predict_returns(1.0, 1)['Predicted_Return'][:60], expected, rtol=1e-12)
+        assert len(predictor._path) >= 60
+
+
+def test_path_is_resimulated_when_weights_or_data_change():
+    """La trayectoria guardada no se reutiliza si cambian los pesos o los datos del predictor."""
+    predictor, model = predictor_entrenado()
+    predictor.model = model
+    before = predictor.predict_returns(1000.0, 1)
+
+    def esperado(data, weights):
+        reference = PortfolioPredictor(data, weights)
+        reference.model = model
+        return reference.predict_returns(1000.0, 1)
+
+    predictor.weights = np.array([0.7, 0.1, 0.1, 0.1])
+    after = predictor.predict_returns(1000.0, 1)
+    assert not after.equals(before)
+    assert after.equals(esperado(predictor.data, predictor.weights.copy()))
+
+    # Un cambio de pesos en el mismo arreglo también se detecta
+    predictor.weights[:] = [0.1, 0.1, 0.1, 0.7]
+    assert predictor.predict_returns(1000.0, 1).equals(esperado(predictor.data, predictor.weights.copy()))
+
+    predictor.data = generar_precios(4, n_days=400, seed=7)
+    assert predictor.predict_returns(1000.0, 1).equals(esperado(predictor.data, predictor.weights.copy()))
+
+
+if __name__ == "__main__":
+    test_vectorized_windows_are_bit_identical()
+    test_multi_horizon_reuses_one_path()
+    test_batched_forecast_matches_single_paths()
+    test_path_is_resimulated_when_weights_or_data_change()
+    print("\n=== Todas las pruebas completadas exitosamente ===")
@@ -0,0 +1,185 @@
+# test_model_registry.py
+import os
+import json
+import time
+import pickle
+import tempfile
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from model_registry import ModelRegistry
+from model_cache import ModelCache, get_model_cache
+from tree_ensemble import CompiledTreeEnsemble
+from ml_predictor import PortfolioPredictor
+from benchmark_optimizacion import generar_precios
+
+
+def test_key_depends_on_data_window_and_params():
+    """La clave cambia con los datos, la ventana o los hiperparámetros, y no con nada más."""
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(50, 5)), rng.normal(size=50)
+    params = {"max_iter": 100, "max_depth": 15}
+    key = ModelRegistry.model_key(X, y, 5, params)
+    assert key == ModelRegistry.model_key(X.copy(), y.copy(), 5, dict(reversed(list(params.items()))))
+    changed = X.copy()
+    changed[3, 2] += 1e-12
+    assert key != ModelRegistry.model_key(changed, y, 5, params)
+    assert key != ModelRegistry.model_key(X, y, 10, params)
+    assert key != ModelRegistry.model_key(X, y, 5, {**params, "max_depth": 3})
+
+
+def test_concurrent_saves_keep_every_entry():
+    """Varios escritores a la vez no pierden entradas del manifiesto."""
+    with tempfile.TemporaryDirectory() as models_dir:
+        keys = [ModelRegistry.model_key(np.full((2, 2), i), np.zeros(2), 2, {}) for i in range(16)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            # Un registro por escritor, como si fueran procesos distintos
+            list(pool.map(lambda key: ModelRegistry(models_dir).save(key, {"key": key}), keys))
+
+        with open(os.path.join(models_dir, ModelRegistry.MANIFEST_FILE)) as f:
+            assert set(json.load(f)) == set(keys)
+        registry = ModelRegistry(models_dir)
+        for key in keys:
+            assert registry.load(key) == {"key": key}
+        assert registry.load(keys[0][:16]) == {"key": keys[0]}
+        assert not [name for name in os.listdir(models_dir) if name.endswith(".tmp")]
+
+
+def test_write_rereads_manifest_changed_within_mtime_resolution():
+    """Una escritura de otro proceso que el caché no distingue no se pierde en la siguiente."""
+    with tempfile.TemporaryDirectory() as models_dir:
+        keys = [ModelRegistry.model_key(np.full((2, 2), i), np.zeros(2), 2, {}) for i in range(3)]
+        first, other = ModelRegistry(models_dir), ModelRegistry(models_dir)
+        first.save(keys[0], {"key": keys[0]})
+        assert first.find(keys[0]) is not None
+        other.save(keys[1], {"key": keys[1]})
+
+        # Simula que el manifiesto nuevo tiene la misma marca que la copia en memoria
+        stat = os.stat(os.path.join(models_dir, ModelRegistry.MANIFEST_FILE))
+        first._manifest_stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        assert first.find(keys[1]) is None
+        first.save(keys[2], {"key": keys[2]})
+
+        assert set(ModelRegistry(models_dir)._read_manifest()) == set(keys)
+
+
+def test_predictor_reuses_registered_model():
+    """Un segundo entrenamiento con los mismos datos reutiliza el modelo registrado."""
+    prices = generar_precios(3, n_days=200)
+    weights = np.array([0.5, 0.3, 0.2])
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            first = PortfolioPredictor(prices, weights)
+            first.train_or_load_model(window_size=10)
+            second = PortfolioPredictor(prices, weights)
+            second.train_or_load_model(window_size=10)
+            assert second.model_key == first.model_key
+            assert len([name for name in os.listdir("models") if name.endswith(".pkl")]) == 1
+
+            X, _ = first.prepare_data(10)
+            np.testing.assert_array_equal(second.model.predict(X), first.model.predict(X))
+
+            loaded = PortfolioPredictor(prices, weights)
+            loaded.train_or_load_model(train_new_model=False, model_id=first.model_key[:16])
+            np.testing.assert_array_equal(loaded.model.predict(X), first.model.predict(X))
+
+            other = PortfolioPredictor(prices, np.array([0.2, 0.3, 0.5]))
+            other.train_or_load_model(window_size=10)
+            assert other.model_key != first.model_key
+        finally:
+            os.chdir(cwd)
+
+
+def test_compiled_artifact_is_memory_mapped_and_cached():
+    """El modelo compilado se abre con mmap, predice igual y se carga una sola vez por proceso."""
+    prices = generar_precios(3, n_days=200)
+    weights = np.array([0.5, 0.3, 0.2])
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            trained = PortfolioPredictor(prices, weights)
+            trained.train_or_load_model(window_size=10)
+            X, _ = trained.prepare_data(10)
+            expected = trained.model.predict(X)
+
+            misses = get_model_cache().misses
+            predictors = [PortfolioPredictor(prices, weights) for _ in range(3)]
+            for predictor in predictors:
+                predictor.train_or_load_model(train_new_model=False, model_id=trained.model_key)
+                predictor.compile_model()
+            # Un pickle y un compilado, sin importar cuántos predictores los pidan
+            assert get_model_cache().misses - misses == 2
+            assert all(predictor.model is predictors[0].model for predictor in predictors)
+
+            compiled = predictors[0].model
+            assert isinstance(compiled, CompiledTreeEnsemble)
+            assert isinstance(compiled.feature, np.memmap)
+            np.testing.assert_allclose(compiled.predict(X), expected, rtol=1e-12)
+        finally:
+            os.chdir(cwd)
+            get_model_cache().clear()
+
+
+def test_cache_evicts_least_recently_used_by_bytes():
+    """Al superar el límite de bytes se desaloja el modelo usado hace más tiempo."""
+    cache = ModelCache(max_bytes=250)
+    arrays = {name: np.zeros(100, dtype=np.uint8) for name in "abc"}
+    for name in "ab":
+        cache.get(name, lambda name=name: arrays[name])
+    cache.get("a", lambda: None)  # "a" pasa a ser el más reciente
+    cache.get("c", lambda: arrays["c"])
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.current_bytes == 200 and cache.hits == 1 and cache.misses == 3
+
+
+def test_cache_loads_outside_the_lock_once_per_key():
+    """Una carga lenta se hace una sola vez por clave y no bloquea a quien pide otro modelo."""
+    cache = ModelCache()
+    release = threading.Event()
+    loads = []
+
+    def slow_loader():
+        loads.append("lento")
+        assert release.wait(10)
+        return "modelo lento"
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        slow = [pool.submit(cache.get, "lento", slow_loader) for _ in range(2)]
+        while not loads:
+            time.sleep(0.01)
+        assert pool.submit(cache.get, "rápido", lambda: "modelo rápido").result(timeout=2) == "modelo rápido"
+        assert "lento" not in cache and len(cache) == 1
+        release.set()
+        assert [future.result(timeout=10) for future in slow] == ["modelo lento"] * 2
+    assert loads == ["lento"] and cache.misses == 2 and not cache._pending
+
+
+def test_cache_counts_file_size_of_loaded_models():
+    """Un modelo sin nbytes ocupa en la caché el tamaño del archivo del que se cargó."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "modelo.pkl")
+        with open(path, "wb") as f:
+            pickle.dump({"pesos": list(range(1000))}, f)
+
+        def load():
+            with open(path, "rb") as f:
+                return pickle.load(f)
+
+        cache = ModelCache()
+        cache.get("modelo", load, path=path)
+        assert cache.current_bytes == os.path.getsize(path)
+
+
+if __name__ == "__main__":
+    test_key_depends_on_data_window_and_params()
+    test_concurrent_saves_keep_every_entry()
+    test_write_rereads_manifest_changed_within_mtime_resolution()
+    test_predictor_reuses_registered_model()
+    test_compiled_artifact_is_memory_mapped_and_cached()
+    test_cache_evicts_least_recently_used_by_bytes()
+    test_cache_loads_outside_the_lock_once_per_key()
+    test_cache_counts_file_size_of_loaded_models()
+    print("\n=== Todas las pruebas completadas exitosamente ===")
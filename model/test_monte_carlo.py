@@ -0,0 +1,65 @@
+# test_monte_carlo.py
+import numpy as np
+import pandas as pd
+from monte_carlo import MonteCarloSimulator
+from benchmark_optimizacion import generar_precios
+
+
+def test_constant_returns_give_exact_growth():
+    """Con un retorno diario constante todas las trayectorias coinciden con el crecimiento exacto."""
+    prices = pd.DataFrame({"A": 100 * 1.001 ** np.arange(300), "B": 50 * 1.001 ** np.arange(300)})
+    simulator = MonteCarloSimulator(prices, np.array([0.5, 0.5]), seed=0)
+    bands = simulator.simulate(1000.0, horizons=(1, 2), n_paths=500, chunk_size=128)
+
+    assert set(bands) == {1, 2}
+    assert bands[1]['Day'].iloc[-1] == 252 and bands[2]['Day'].iloc[-1] == 504
+    expected = 1000.0 * 1.001 ** bands[2]['Day'].to_numpy()
+    for column in ("P5", "P50", "P95"):
+        np.testing.assert_allclose(bands[2][column], expected, rtol=1e-5)
+    # El horizonte corto es el inicio del largo
+    np.testing.assert_allclose(bands[1]['P50'], bands[2]['P50'].iloc[:len(bands[1])])
+
+
+def test_bands_are_reproducible_and_ordered():
+    """Con la misma semilla el resultado se repite y las bandas quedan ordenadas."""
+    prices = generar_precios(4, n_days=800)
+    weights = np.array([0.4, 0.3, 0.2, 0.1])
+    for method in ("bootstrap", "parametric"):
+        first = MonteCarloSimulator(prices, weights, seed=7).simulate(100.0, (3, 5), n_paths=3000, method=method)
+        second = MonteCarloSimulator(prices, weights, seed=7).simulate(100.0, (3, 5), n_paths=3000, method=method)
+        for years in (3, 5):
+            pd.testing.assert_frame_equal(first[years], second[years])
+            assert (first[years]['P5'] < first[years]['P50']).all()
+            assert (first[years]['P50'] < first[years]['P95']).all()
+
+    # La mediana paramétrica se acerca a exp(días · E[log(1 + r)])
+    simulator = MonteCarloSimulator(prices, weights, seed=1)
+    bands = simulator.simulate(100.0, (3,), n_paths=20000, method="parametric")
+    drift = simulator.mean - simulator.std ** 2 / 2
+    assert abs(bands[3]['P50'].iloc[-1] / (100.0 * np.exp(756 * drift)) - 1) < 0.02
+
+
+def test_parametric_paths_stay_finite_with_high_volatility():
+    """Con volatilidad diaria alta una normal simple daría retornos <= -100 % y log1p NaN."""
+    rng = np.random.default_rng(3)
+    returns = np.clip(rng.normal(0.002, 0.45, size=(500, 1)), -0.95, None)
+    prices = pd.DataFrame({"A": 100 * np.cumprod(1 + returns[:, 0])})
+    simulator = MonteCarloSimulator(prices, np.array([1.0]), seed=0)
+    assert simulator.std > 0.3
+
+    draws = simulator._draw_log_returns(2000, 252, "parametric")
+    assert np.isfinite(draws).all()
+    # El retorno simple simulado conserva la media y la volatilidad históricas
+    simple = np.expm1(draws)
+    assert abs(simple.mean() - simulator.mean) < 0.01
+    assert abs(simple.std() / simulator.std - 1) < 0.05
+
+    bands = simulator.simulate(100.0, (1,), n_paths=2000, method="parametric")
+    assert np.isfinite(bands[1][["P5", "P50", "P95"]].to_numpy()).all()
+
+
+if __name__ == "__main__":
+    test_constant_returns_give_exact_growth()
+    test_bands_are_reproducible_and_ordered()
+    test_parametric_paths_stay_finite_with_high_volatility()
+    print("\n=== Todas las pruebas completadas exitosamente ===")
@@ -4,6 +4,7 @@ import numpy as np
 from data_loader import DataLoader
 from portfolio_analysis import PortfolioAnalyzer
 from ml_predictor import PortfolioPredictor
+from batch_optimizer import optimize_portfolios_detailed, results_table
 import matplotlib.pyplot as plt
 
 def mostrar_resultados_portafolio(nombre, resultados):
@@ -65,26 +66,19 @@ def ejecutar_analisis():
     loader = DataLoader(start_date="2017-11-09")  # Últimos 4 años de datos
     portfolio_data = loader.process_portfolios(portfolios)
 
-    # 3. Analizar cada portafolio
-    portfolio_results = {}
-    for name, data in portfolio_data.items():
-        if not data.empty:
-            print(f"\nAnalizando portafolio {name}...")
-            analyzer = PortfolioAnalyzer(data)
-            returns, volatility = analyzer.calculate_metrics()
-            optimal_weights = analyzer.optimize_weights()
-            
-            portfolio_results[name] = {
-                'returns': returns,
-                'volatility': volatility,
-                'optimal_weights': optimal_weights
-            }
-            
-            # Mostrar resultados en consola
-            mostrar_resultados_portafolio(name, portfolio_results[name])
-            
-            # Mostrar gráfico de distribución
-            mostrar_grafico_portafolio(analyzer, optimal_weights, name)
+    # 3. Analizar y optimizar todos los portafolios en paralelo
+    print("\nOptimizando portafolios...")
+    portfolio_results = optimize_portfolios_detailed(portfolio_data)
+    print("\nTabla de resultados:")
+    print(results_table(portfolio_results).round(4))
+
+    for name, resultados in portfolio_results.items():
+        # Mostrar resultados en consola
+        mostrar_resultados_portafolio(name, resultados)
+        
+        # Mostrar gráfico de distribución
+        analyzer = PortfolioAnalyzer(portfolio_data[name])
+        mostrar_grafico_portafolio(analyzer, resultados['optimal_weights'], name)
 
     # 4. Guardar resultados en un archivo CSV
     guardar_resultados_csv(portfolio_results)
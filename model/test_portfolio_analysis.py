@@ -0,0 +1,200 @@
+# test_portfolio_analysis.py
+import numpy as np
+import pandas as pd
+from portfolio_analysis import PortfolioAnalyzer, CompoundPortfolioAnalyzer
+from benchmark_optimizacion import generar_precios, optimizar_sin_cache
+from batch_optimizer import optimize_portfolios, optimize_portfolios_detailed
+
+
+def test_cached_moments_match_pandas():
+    """Los momentos precalculados coinciden con los de pandas."""
+    analyzer = PortfolioAnalyzer(generar_precios(6, n_days=400), risk_free_rate=0.02)
+    returns, volatility = analyzer.calculate_metrics()
+    np.testing.assert_allclose(returns.values, analyzer.returns.mean().values * 252)
+    np.testing.assert_allclose(volatility.values, analyzer.returns.std().values * np.sqrt(252))
+    np.testing.assert_allclose(analyzer.cov_matrix, analyzer.returns.cov().values * 252)
+
+
+def test_analytic_gradient_matches_finite_differences():
+    """El optimizador con gradiente analítico llega al mismo óptimo que con diferencias finitas."""
+    for n_assets in (4, 12):
+        analyzer = PortfolioAnalyzer(generar_precios(n_assets, n_days=600, seed=n_assets), risk_free_rate=0.02)
+        expected = optimizar_sin_cache(analyzer, max_weight=0.6, min_weight=0.0)
+        result = analyzer.optimize_weights(max_weight=0.6, min_weight=0.0)
+        assert result['success']
+        assert abs(result['sharpe_ratio'] - expected['sharpe_ratio']) < 1e-6
+        np.testing.assert_allclose(result['weights'], expected['weights'], atol=1e-3)
+        performance = analyzer.portfolio_performance(result['weights'])
+        assert abs(performance['sharpe_ratio'] - result['sharpe_ratio']) < 1e-12
+
+
+def test_efficient_frontier():
+    """La frontera es creciente en riesgo y retorno y contiene al portafolio de máximo Sharpe."""
+    analyzer = PortfolioAnalyzer(generar_precios(8, n_days=600), risk_free_rate=0.02)
+    frontier = analyzer.efficient_frontier(n_points=40, max_weight=0.4, min_weight=0.02)
+    assert frontier['success'].all()
+    assert frontier['weights'].shape == (40, 8)
+    np.testing.assert_allclose(frontier['weights'].sum(axis=1), 1.0)
+    assert (frontier['weights'] >= 0.02 - 1e-9).all() and (frontier['weights'] <= 0.4 + 1e-9).all()
+    assert (np.diff(frontier['returns']) > 0).all()
+    assert (np.diff(frontier['volatilities']) > -1e-9).all()
+
+    optimal = analyzer.optimize_weights(max_weight=0.4, min_weight=0.02)
+    assert frontier['sharpe_ratios'].max() <= optimal['sharpe_ratio'] + 1e-6
+    assert frontier['sharpe_ratios'].max() >= optimal['sharpe_ratio'] - 0.01
+
+
+def test_batch_optimization_matches_sequential():
+    """La optimización en paralelo devuelve la misma tabla que la secuencial."""
+    portfolio_data = {f"P{n}": generar_precios(n, n_days=500, seed=n) for n in (4, 5, 6)}
+    portfolio_data["Vacío"] = generar_precios(3).iloc[:0]
+    parallel = optimize_portfolios(portfolio_data, risk_free_rate=0.02, max_workers=3)
+    sequential = optimize_portfolios(portfolio_data, risk_free_rate=0.02, max_workers=1)
+
+    assert len(parallel) == 4 + 5 + 6
+    assert list(parallel['Portafolio'].unique()) == ["P4", "P5", "P6"]
+    np.testing.assert_allclose(parallel['Peso Óptimo'], sequential['Peso Óptimo'])
+    np.testing.assert_allclose(parallel.groupby('Portafolio')['Peso Óptimo'].sum(), 1.0)
+    expected = PortfolioAnalyzer(portfolio_data["P5"], risk_free_rate=0.02).optimize_weights()
+    assert abs(parallel.loc[parallel['Portafolio'] == "P5", 'Sharpe Portafolio'].iloc[0]
+               - expected['sharpe_ratio']) < 1e-12
+
+
+def test_batch_error_names_failing_portfolio():
+    """Un portafolio que no se puede optimizar se identifica por su nombre, también desde el pool."""
+    portfolio_data = {"Bien": generar_precios(4, n_days=300), "Roto": generar_precios(2, n_days=300)}
+    for max_workers in (1, 2):
+        try:
+            optimize_portfolios_detailed(portfolio_data, risk_free_rate=0.02, frontier_points=5,
+                                         max_workers=max_workers)
+        except ValueError as e:
+            assert "Roto" in str(e)
+        else:
+            raise AssertionError("Se esperaba un ValueError")
+
+
+def compound_returns_con_add(portfolio_data, portfolio_weights):
+    """Implementación original con un DataFrame.add por portafolio, usada como referencia."""
+    all_returns = pd.DataFrame()
+    for name, data in portfolio_data.items():
+        weighted_returns = data.pct_change().dropna().mul(portfolio_weights[name])
+        all_returns = weighted_returns if all_returns.empty else all_returns.add(weighted_returns, fill_value=0)
+    return all_returns
+
+
+def test_compound_returns_vectorized():
+    """La agregación vectorizada coincide con la original y maneja portafolios de distinto largo."""
+    prices = generar_precios(7, n_days=300)
+    portfolio_data = {
+        "A": prices[["A0", "A1", "A2"]],
+        # Portafolio más corto y con días salteados
+        "B": prices[["A3", "A4", "A5", "A6"]].iloc[100::2]
+    }
+    portfolio_weights = {"A": 0.6, "B": 0.4}
+    asset_weights = {"A": np.array([0.5, 0.3, 0.2]), "B": np.array([0.25, 0.25, 0.25, 0.25])}
+    analyzer = CompoundPortfolioAnalyzer(portfolio_data, portfolio_weights, risk_free_rate=0.02,
+                                         asset_weights=asset_weights, alignment=None)
+
+    # Donde la versión original dejaba NaN (días sin cotizar) ahora hay retorno 0
+    expected = compound_returns_con_add(portfolio_data, portfolio_weights).fillna(0)
+    pd.testing.assert_frame_equal(analyzer.compound_returns[expected.columns], expected, check_freq=False)
+
+    expected_series = pd.Series(0.0, index=expected.index)
+    for name, data in portfolio_data.items():
+        sleeve = data.pct_change().dropna() @ asset_weights[name] * portfolio_weights[name]
+        expected_series = expected_series.add(sleeve, fill_value=0)
+    np.testing.assert_allclose(analyzer.portfolio_returns.values, expected_series.values, atol=1e-15)
+    assert (analyzer.portfolio_returns.index == expected.index).all()
+
+    metrics = analyzer.get_portfolio_metrics()
+    np.testing.assert_allclose(metrics['return'], expected_series.mean() * 252)
+
+
+def precios_con_hora(dates, values, tz, hour=0):
+    """Precios con la hora local de cada mercado, como los CSV descargados."""
+    index = pd.DatetimeIndex([pd.Timestamp(date).tz_localize(tz) + pd.Timedelta(hours=hour) for date in dates])
+    return pd.DataFrame(values, index=index.tz_convert("UTC"))
+
+
+def test_compound_returns_align_sleeves_with_different_timezones():
+    """Cada día de mercado es una sola fila aunque los portafolios tengan distinta hora."""
+    rng = np.random.default_rng(5)
+    business_days = pd.bdate_range("2024-01-01", periods=80)
+    all_days = pd.date_range("2024-01-01", periods=112)
+    equities = 100 * np.cumprod(1 + rng.normal(0, 0.01, size=(80, 2)), axis=0)
+    bonds = 4 + np.cumsum(rng.normal(0, 0.02, size=(80, 2)), axis=0)
+    crypto = 100 * np.cumprod(1 + rng.normal(0, 0.03, size=(112, 1)), axis=0)
+    # Un bono con hora de Nueva York y otro de Chicago, en el mismo portafolio
+    bonds_ny = precios_con_hora(business_days, {"^FVX": bonds[:, 0]}, "America/New_York")
+    bonds_chicago = precios_con_hora(business_days, {"^TNX": bonds[:, 1]}, "America/Chicago")
+    portfolio_data = {
+        "Acciones": precios_con_hora(business_days, {"SPY": equities[:, 0], "QQQ": equities[:, 1]}, "America/New_York"),
+        "Bonos": pd.concat([bonds_ny, bonds_chicago], axis=1, sort=True),
+        "Cripto": precios_con_hora(all_days, {"BTC-USD": crypto[:, 0]}, "UTC")
+    }
+    portfolio_weights = {"Acciones": 0.5, "Bonos": 0.3, "Cripto": 0.2}
+    analyzer = CompoundPortfolioAnalyzer(portfolio_data, portfolio_weights, risk_free_rate=0.02, alignment=None)
+
+    # Referencia por fecha: retornos de cada portafolio con precios indexados por día
+    by_date = {
+        "Acciones": pd.DataFrame(equities, index=business_days),
+        "Bonos": pd.DataFrame(bonds, index=business_days),
+        "Cripto": pd.DataFrame(crypto, index=all_days)
+    }
+    expected = pd.Series(0.0, index=all_days[1:])
+    for name, prices in by_date.items():
+        sleeve = prices.pct_change().dropna().mean(axis=1) * portfolio_weights[name]
+        expected = expected.add(sleeve, fill_value=0)
+
+    assert len(analyzer.portfolio_returns) == len(all_days) - 1
+    np.testing.assert_allclose(analyzer.portfolio_returns.to_numpy(), expected.to_numpy(), atol=1e-15)
+    assert (analyzer.portfolio_returns.index == expected.index).all()
+    metrics = analyzer.get_portfolio_metrics()
+    np.testing.assert_allclose(metrics['return'], expected.mean() * 252)
+    np.testing.assert_allclose(metrics['volatility'], expected.std() * np.sqrt(252))
+
+    # Por defecto todos los portafolios comparten los días en que cotizan todos los activos:
+    # la cripto acumula el fin de semana en el lunes
+    aligned = CompoundPortfolioAnalyzer(portfolio_data, portfolio_weights, risk_free_rate=0.02)
+    expected = pd.Series(0.0, index=business_days[1:])
+    for name, prices in by_date.items():
+        sleeve = prices.reindex(business_days).pct_change().dropna().mean(axis=1) * portfolio_weights[name]
+        expected = expected.add(sleeve, fill_value=0)
+    assert len(aligned.portfolio_returns) == len(business_days) - 1
+    np.testing.assert_allclose(aligned.portfolio_returns.to_numpy(), expected.to_numpy(), atol=1e-15)
+    assert (aligned.portfolio_returns.index == expected.index).all()
+    np.testing.assert_allclose(aligned.get_portfolio_metrics()['return'], expected.mean() * 252)
+
+
+def test_online_update_matches_full_rebuild():
+    """update da la misma media y covarianza que construir el analizador con todo el historial."""
+    prices = generar_precios(6, n_days=500)
+    prices.iloc[420, 2] = np.nan  # Un precio faltante descarta dos retornos, como dropna
+    analyzer = PortfolioAnalyzer(prices.iloc[:400], risk_free_rate=0.02)
+    added = analyzer.update(prices.iloc[400:450])
+    for date, row in prices.iloc[450:].iterrows():
+        added += analyzer.update(row.rename(date))
+
+    expected = PortfolioAnalyzer(prices, risk_free_rate=0.02)
+    assert added == len(expected.returns) - 399
+    np.testing.assert_allclose(analyzer.mean_returns, expected.mean_returns, rtol=1e-12)
+    np.testing.assert_allclose(analyzer.cov_matrix, expected.cov_matrix, rtol=1e-10)
+    np.testing.assert_array_equal(analyzer.cov_matrix, analyzer.cov_matrix.T)
+    pd.testing.assert_frame_equal(analyzer.returns, expected.returns, check_freq=False)
+    pd.testing.assert_frame_equal(analyzer.data, expected.data, check_freq=False)
+
+    weights = np.full(6, 1 / 6)
+    performance, expected_performance = analyzer.portfolio_performance(weights), expected.portfolio_performance(weights)
+    np.testing.assert_allclose(performance['sharpe_ratio'], expected_performance['sharpe_ratio'], rtol=1e-10)
+
+
+if __name__ == "__main__":
+    test_cached_moments_match_pandas()
+    test_analytic_gradient_matches_finite_differences()
+    test_efficient_frontier()
+    test_batch_optimization_matches_sequential()
+    test_batch_error_names_failing_portfolio()
+    test_compound_returns_vectorized()
+    test_compound_returns_align_sleeves_with_different_timezones()
+    test_online_update_matches_full_rebuild()
+    print("\n=== Todas las pruebas completadas exitosamente ===")
@@ -0,0 +1,95 @@
+# test_profile_artifacts.py
+import os
+import tempfile
+import pandas as pd
+from analysis_pipeline import AnalysisPipeline, MODELS_DIR
+from model_registry import ModelRegistry
+from precompute_profiles import precompute_profiles
+from profile_artifacts import load_profiles
+from model_cache import get_model_cache
+from test_analysis_pipeline import PORTAFOLIOS, crear_datos
+
+PERFILES = {"Prudente": {"A": 0.7, "B": 0.3}, "Audaz": {"A": 1.0, "B": 0}}
+
+
+def test_precomputed_profiles_match_live_results():
+    """El artefacto reproduce el análisis en vivo y se sirve sin cargar datos."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            crear_datos("data")
+            path = precompute_profiles(os.path.join("artifacts", "perfiles.pkl"), "data",
+                                       profiles=PERFILES, portfolios=PORTAFOLIOS)
+            live = AnalysisPipeline(data_dir="data", portfolios=PORTAFOLIOS).run(PERFILES["Prudente"])
+            assert set(load_profiles(path)["profiles"]) == set(PERFILES)
+
+            # Los perfiles precalculados se sirven sin cargar datos
+            pipeline = AnalysisPipeline(data_dir="data", portfolios=PORTAFOLIOS, artifact_path=path)
+            served = pipeline.run({"B": 0.3, "A": 0.7})
+            assert not pipeline._data
+            assert pipeline.run(PERFILES["Prudente"]) is served
+
+            assert set(served) == set(live) and served.warnings == live.warnings == []
+            for name in live:
+                for years in (3, 5, 10):
+                    expected, result = live[name]['predictions'][years], served[name]['predictions'][years]
+                    pd.testing.assert_frame_equal(result['predictions'], expected['predictions'])
+                    assert len(result['predictions']) == years * 252
+                    assert result['final_value'] == expected['final_value']
+                    assert result['initial_value'] == expected['initial_value']
+                assert (served[name]['optimal_weights']['weights'] == live[name]['optimal_weights']['weights']).all()
+
+            # Otra asignación o un capital distinto se calculan en vivo
+            assert pipeline._precomputed({"A": 0.5, "B": 0.5}, "2017-11-09", "2024-10-31", 100000) is None
+            assert pipeline._precomputed(PERFILES["Audaz"], "2017-11-09", "2024-10-31", 50000) is None
+        finally:
+            os.chdir(cwd)
+            get_model_cache().clear()
+
+
+def tocar(path):
+    """Adelanta un segundo la fecha de modificación de un archivo."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_stale_artifact_falls_back_to_live_analysis():
+    """Con datos o un modelo más nuevos que el artefacto, el análisis se calcula en vivo."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            crear_datos("data")
+            path = precompute_profiles(os.path.join("artifacts", "perfiles.pkl"), "data",
+                                       profiles=PERFILES, portfolios=PORTAFOLIOS)
+            pipeline = AnalysisPipeline(data_dir="data", portfolios=PORTAFOLIOS, artifact_path=path)
+            allocation = PERFILES["Prudente"]
+            assert pipeline._precomputed(allocation, "2017-11-09", "2024-10-31", 100000) is not None
+
+            # Un CSV actualizado después de precalcular
+            tocar(os.path.join("data", "A0.csv"))
+            assert pipeline._precomputed(allocation, "2017-11-09", "2024-10-31", 100000) is None
+            live = pipeline.run(allocation)
+            assert pipeline._data and set(live) == {"A", "B"}
+
+            # Al volver a precalcular se sirve otra vez desde el artefacto
+            precompute_profiles(path, "data", profiles=PERFILES, portfolios=PORTAFOLIOS)
+            assert pipeline._precomputed(allocation, "2017-11-09", "2024-10-31", 100000) is not None
+
+            # Tocar el manifiesto sin cambiar sus entradas no invalida el artefacto
+            tocar(os.path.join(MODELS_DIR, ModelRegistry.MANIFEST_FILE))
+            assert pipeline._precomputed(allocation, "2017-11-09", "2024-10-31", 100000) is not None
+
+            # Un modelo registrado después de precalcular
+            ModelRegistry(MODELS_DIR).save("f" * 64, {"modelo": "nuevo"})
+            assert pipeline._precomputed(allocation, "2017-11-09", "2024-10-31", 100000) is None
+        finally:
+            os.chdir(cwd)
+            get_model_cache().clear()
+
+
+if __name__ == "__main__":
+    test_precomputed_profiles_match_live_results()
+    test_stale_artifact_falls_back_to_live_analysis()
+    print("\n=== Todas las pruebas completadas exitosamente ===")
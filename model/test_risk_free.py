@@ -0,0 +1,118 @@
+# test_risk_free.py
+import os
+import json
+import time
+import tempfile
+import pandas as pd
+import risk_free
+
+
+class FakeDownload:
+    """Reemplaza a yf.download y cuenta las llamadas a la red."""
+
+    def __init__(self, close=4.0):
+        self.close = close
+        self.calls = 0
+
+    def __call__(self, ticker, start, end):
+        self.calls += 1
+        index = pd.date_range(start, end, freq="B")
+        return pd.DataFrame({"Close": self.close}, index=index)
+
+
+def con_descarga_falsa(test):
+    """Ejecuta una prueba con la caché vacía y sin acceso a Yahoo Finance."""
+    def wrapper():
+        original = risk_free.yf.download
+        risk_free.yf.download = fake = FakeDownload()
+        risk_free._rate_cache.clear()
+        try:
+            with tempfile.TemporaryDirectory() as data_dir:
+                test(data_dir, fake)
+        finally:
+            risk_free.yf.download = original
+            risk_free._rate_cache.clear()
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+
+@con_descarga_falsa
+def test_rate_from_stored_csv(data_dir, fake):
+    """Con el CSV de ^TNX de DataLoader la tasa se calcula sin acceder a la red."""
+    index = ["2020-01-02 00:00:00-06:00", "2020-01-03 00:00:00-06:00", "2020-01-06 00:00:00-06:00"]
+    pd.DataFrame({"^TNX": [1.0, 2.0, 3.0]}, index=pd.Index(index, name="Date")).to_csv(
+        os.path.join(data_dir, "^TNX.csv"))
+
+    rate = risk_free.get_average_risk_free_rate("2020-01-01", "2020-01-07", data_dir=data_dir)
+    assert abs(rate - 0.02) < 1e-12
+    assert fake.calls == 0
+
+    # Un período que el CSV no cubre sí se descarga
+    risk_free.get_average_risk_free_rate("2019-01-01", "2020-01-07", data_dir=data_dir)
+    assert fake.calls == 1
+
+
+@con_descarga_falsa
+def test_rate_is_memoized_and_cached_on_disk(data_dir, fake):
+    """La tasa descargada se reutiliza en memoria y en disco hasta que vence el TTL."""
+    for _ in range(5):
+        rate = risk_free.get_average_risk_free_rate("2021-01-01", "2021-06-30", data_dir=data_dir)
+    assert abs(rate - 0.04) < 1e-12
+    assert fake.calls == 1
+
+    # Otro proceso (memoria vacía) lee la caché en disco
+    risk_free._rate_cache.clear()
+    risk_free.get_average_risk_free_rate("2021-01-01", "2021-06-30", data_dir=data_dir)
+    assert fake.calls == 1
+
+    # Una entrada vencida se vuelve a descargar
+    cache_path = os.path.join(data_dir, risk_free.CACHE_FILE)
+    with open(cache_path, "r", encoding="utf-8") as f:
+        cache = json.load(f)
+    cache["2021-01-01|2021-06-30"]["timestamp"] = time.time() - 2 * risk_free.CACHE_TTL
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    risk_free._rate_cache.clear()
+    risk_free.get_average_risk_free_rate("2021-01-01", "2021-06-30", data_dir=data_dir)
+    assert fake.calls == 2
+
+
+@con_descarga_falsa
+def test_memo_depends_on_folder_csv_and_ttl(data_dir, fake):
+    """La memoria del proceso no mezcla carpetas, ve un CSV actualizado y vence con el TTL."""
+    def guardar_tnx(folder, values):
+        index = ["2020-01-02 00:00:00-06:00", "2020-01-03 00:00:00-06:00", "2020-01-06 00:00:00-06:00"]
+        file_path = os.path.join(folder, "^TNX.csv")
+        pd.DataFrame({"^TNX": values}, index=pd.Index(index, name="Date")).to_csv(file_path)
+        return file_path
+
+    file_path = guardar_tnx(data_dir, [1.0, 2.0, 3.0])
+    other_dir = os.path.join(data_dir, "otra")
+    os.makedirs(other_dir)
+    guardar_tnx(other_dir, [5.0, 5.0, 5.0])
+    rate = risk_free.get_average_risk_free_rate("2020-01-01", "2020-01-07", data_dir=data_dir)
+    other = risk_free.get_average_risk_free_rate("2020-01-01", "2020-01-07", data_dir=other_dir)
+    assert abs(rate - 0.02) < 1e-12 and abs(other - 0.05) < 1e-12
+
+    # CSV actualizado: la tasa se recalcula sin esperar al TTL
+    guardar_tnx(data_dir, [4.0, 4.0, 4.0])
+    stat = os.stat(file_path)
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    rate = risk_free.get_average_risk_free_rate("2020-01-01", "2020-01-07", data_dir=data_dir)
+    assert abs(rate - 0.04) < 1e-12
+
+    # Una tasa descargada vence en memoria con el TTL
+    risk_free.get_average_risk_free_rate("2021-01-01", "2021-06-30", data_dir=data_dir, ttl=60)
+    key = (os.path.abspath(data_dir), "2021-01-01", "2021-06-30")
+    rate, timestamp, version = risk_free._rate_cache[key]
+    risk_free._rate_cache[key] = (rate, timestamp - 120, version)
+    os.remove(os.path.join(data_dir, risk_free.CACHE_FILE))
+    risk_free.get_average_risk_free_rate("2021-01-01", "2021-06-30", data_dir=data_dir, ttl=60)
+    assert fake.calls == 2
+
+
+if __name__ == "__main__":
+    test_rate_from_stored_csv()
+    test_rate_is_memoized_and_cached_on_disk()
+    test_memo_depends_on_folder_csv_and_ttl()
+    print("\n=== Todas las pruebas completadas exitosamente ===")
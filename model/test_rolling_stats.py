@@ -0,0 +1,57 @@
+# test_rolling_stats.py
+import numpy as np
+import pandas as pd
+from rolling_stats import RollingStatistics, rolling_covariances, rolling_metrics
+from portfolio_analysis import PortfolioAnalyzer
+from benchmark_optimizacion import generar_precios
+
+
+def test_rolling_covariances_match_pandas():
+    """Las covarianzas incrementales coinciden con recalcular cada ventana."""
+    returns = generar_precios(5, n_days=400).pct_change().dropna()
+    covariances = rolling_covariances(returns.to_numpy(), 30)
+    assert covariances.shape == (len(returns) - 29, 5, 5)
+    expected = returns.rolling(30).cov().dropna().to_numpy().reshape(-1, 5, 5)
+    np.testing.assert_allclose(covariances, expected, rtol=1e-9, atol=1e-15)
+
+    compact = rolling_covariances(returns.to_numpy(), 30, dtype=np.float32)
+    assert compact.dtype == np.float32 and compact.nbytes == covariances.nbytes // 2
+
+
+def test_streaming_updates_match_batch():
+    """Actualizar día a día da el mismo resultado que la ventana completa."""
+    returns = generar_precios(4, n_days=200).pct_change().dropna().to_numpy()
+    stats = RollingStatistics(90, 4)
+    for day in returns:
+        stats.push(day)
+    window = returns[-90:]
+    np.testing.assert_allclose(stats.mean(), window.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(stats.covariance(), np.cov(window, rowvar=False), rtol=1e-9)
+
+
+def test_rolling_metrics_from_analyzer():
+    """Volatilidad y Sharpe móviles anualizados, por activo y del portafolio."""
+    analyzer = PortfolioAnalyzer(generar_precios(5, n_days=600), risk_free_rate=0.02)
+    weights = np.full(5, 0.2)
+    metrics = analyzer.rolling_statistics((30, 252), weights=weights)
+    returns = analyzer.returns
+    for window in (30, 252):
+        result = metrics[window]
+        expected_vol = returns.rolling(window).std().dropna() * np.sqrt(252)
+        np.testing.assert_allclose(result['volatility'].to_numpy(), expected_vol.to_numpy(), rtol=1e-9)
+        expected_sharpe = (returns.rolling(window).mean().dropna() * 252 - 0.02) / expected_vol
+        np.testing.assert_allclose(result['sharpe'].to_numpy(), expected_sharpe.to_numpy(), rtol=1e-7)
+        assert (result['dates'] == expected_vol.index).all()
+
+        portfolio = returns @ weights
+        expected_portfolio_vol = portfolio.rolling(window).std().dropna() * np.sqrt(252)
+        np.testing.assert_allclose(result['portfolio_volatility'].to_numpy(),
+                                   expected_portfolio_vol.to_numpy(), rtol=1e-9)
+        np.testing.assert_allclose(np.diagonal(result['correlation'], axis1=1, axis2=2), 1.0)
+
+
+if __name__ == "__main__":
+    test_rolling_covariances_match_pandas()
+    test_streaming_updates_match_batch()
+    test_rolling_metrics_from_analyzer()
+    print("\n=== Todas las pruebas completadas exitosamente ===")
@@ -0,0 +1,52 @@
+# test_tree_ensemble.py
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingRegressor
+from tree_ensemble import CompiledTreeEnsemble
+from test_ml_predictor import predictor_entrenado
+
+
+def datos_sinteticos(n_rows, n_features=30, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0, 0.01, size=(n_rows, n_features))
+    y = 0.3 * X[:, -1] - 0.1 * X[:, 0] + rng.normal(0, 0.005, size=n_rows)
+    return X, y
+
+
+def test_compiled_model_matches_sklearn():
+    """El evaluador compilado reproduce la predicción de sklearn, también con valores faltantes."""
+    X, y = datos_sinteticos(1200)
+    X[::11, 5] = np.nan
+    for params in ({"max_iter": 100, "max_depth": 15}, {"max_iter": 20, "max_depth": 3},
+                   {"max_iter": 30, "loss": "poisson"}):
+        target = np.exp(y) if params.get("loss") == "poisson" else y
+        model = HistGradientBoostingRegressor(random_state=42, **params).fit(X, target)
+        compiled = CompiledTreeEnsemble.from_sklearn(model)
+
+        X_test, _ = datos_sinteticos(300, seed=1)
+        X_test[::5, 5] = np.nan
+        np.testing.assert_allclose(compiled.predict(X_test), model.predict(X_test), rtol=1e-12, atol=1e-15)
+        np.testing.assert_allclose(compiled.predict(X_test[0]), model.predict(X_test[:1]), rtol=1e-12, atol=1e-15)
+
+        # Ida y vuelta por los arreglos exportados
+        rebuilt = CompiledTreeEnsemble.from_arrays(compiled.to_arrays())
+        np.testing.assert_array_equal(rebuilt.predict(X_test), compiled.predict(X_test))
+
+
+def test_compiled_predictor_forecast():
+    """Un predictor con el modelo compilado genera la misma trayectoria."""
+    predictor, model = predictor_entrenado()
+    predictor.model = model
+    expected = predictor.predict_returns(1000.0, 1)
+
+    compiled, _ = predictor_entrenado()
+    compiled.model = model
+    compiled.compile_model()
+    assert isinstance(compiled.model, CompiledTreeEnsemble)
+    np.testing.assert_allclose(compiled.predict_returns(1000.0, 1)['Portfolio_Value'],
+                               expected['Portfolio_Value'], rtol=1e-10)
+
+
+if __name__ == "__main__":
+    test_compiled_model_matches_sklearn()
+    test_compiled_predictor_forecast()
+    print("\n=== Todas las pruebas completadas exitosamente ===")
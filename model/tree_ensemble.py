@@ -0,0 +1,115 @@
+import numpy as np
+from typing import Dict
+
+
+class CompiledTreeEnsemble:
+    """
+    Versión compilada de un HistGradientBoostingRegressor ya entrenado.
+
+    Todos los árboles se aplanan en arreglos NumPy compactos (feature, threshold, left,
+    right, value) con índices globales, y la predicción recorre todos los árboles de
+    todas las filas a la vez, un nivel de profundidad por paso. Las hojas apuntan a sí
+    mismas, así que una fila que ya llegó a su hoja se queda ahí en los pasos siguientes.
+    """
+
+    ARRAY_NAMES = ("feature", "threshold", "left", "right", "value", "is_leaf",
+                   "missing_go_to_left", "roots", "params")
+
+    def __init__(self, feature: np.array, threshold: np.array, left: np.array, right: np.array,
+                 value: np.array, is_leaf: np.array, missing_go_to_left: np.array, roots: np.array,
+                 params: np.array):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.is_leaf = is_leaf
+        self.missing_go_to_left = missing_go_to_left
+        self.roots = roots
+        # params = [baseline, max_depth, n_features, log_link]
+        self.params = params
+        self.baseline = float(params[0])
+        self.max_depth = int(params[1])
+        self.n_features_in_ = int(params[2])
+        self.log_link = bool(params[3])
+
+    @classmethod
+    def from_sklearn(cls, model) -> "CompiledTreeEnsemble":
+        """Exporta los árboles de un HistGradientBoostingRegressor entrenado."""
+        if model.n_trees_per_iteration_ != 1:
+            raise ValueError("Solo se soportan modelos de regresión con un árbol por iteración.")
+        link = type(model._loss.link).__name__
+        if link not in ("IdentityLink", "LogLink"):
+            raise ValueError(f"Función de enlace no soportada: {link}")
+
+        trees = [predictors[0].nodes for predictors in model._predictors]
+        if any(tree['is_categorical'].any() for tree in trees):
+            raise ValueError("Los modelos con variables categóricas no están soportados.")
+
+        sizes = np.array([len(tree) for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        nodes = np.concatenate(trees) if trees else np.empty(0, dtype=np.float64)
+        node_offsets = np.repeat(offsets, sizes)
+        own_index = np.arange(len(nodes))
+
+        is_leaf = nodes['is_leaf'].astype(bool)
+        # Índices globales; las hojas apuntan a sí mismas
+        left = np.where(is_leaf, own_index, nodes['left'].astype(np.int64) + node_offsets)
+        right = np.where(is_leaf, own_index, nodes['right'].astype(np.int64) + node_offsets)
+
+        params = np.array([
+            float(np.asarray(model._baseline_prediction).ravel()[0]),
+            float(nodes['depth'].max()) if len(nodes) else 0.0,
+            float(model.n_features_in_),
+            1.0 if link == "LogLink" else 0.0,
+        ])
+        return cls(
+            feature=np.where(is_leaf, 0, nodes['feature_idx']).astype(np.int64),
+            threshold=nodes['num_threshold'].astype(np.float64),
+            left=left.astype(np.int64),
+            right=right.astype(np.int64),
+            value=nodes['value'].astype(np.float64),
+            is_leaf=is_leaf,
+            missing_go_to_left=nodes['missing_go_to_left'].astype(bool),
+            roots=offsets.astype(np.int64),
+            params=params,
+        )
+
+    def to_arrays(self) -> Dict[str, np.array]:
+        """Devuelve los arreglos que definen el modelo (para guardarlos con np.save/np.savez)."""
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.array]) -> "CompiledTreeEnsemble":
+        """Reconstruye el modelo a partir de los arreglos de to_arrays."""
+        return cls(**{name: arrays[name] for name in cls.ARRAY_NAMES})
+
+    @property
+    def nbytes(self) -> int:
+        """Tamaño total de los arreglos del modelo en bytes."""
+        return sum(getattr(self, name).nbytes for name in self.ARRAY_NAMES)
+
+    def predict(self, X: np.array) -> np.array:
+        """Predice para una matriz (n_filas, n_features); mismo resultado que el modelo de sklearn."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Se esperaban {self.n_features_in_} variables y se recibieron {X.shape[1]}.")
+
+        X = np.ascontiguousarray(X)
+        flat_X = X.ravel()
+        row_offsets = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+        has_missing = np.isnan(flat_X).any()
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        for _ in range(self.max_depth):
+            values = flat_X[row_offsets + self.feature[nodes]]
+            go_left = values <= self.threshold[nodes]
+            if has_missing:
+                go_left = np.where(np.isnan(values), self.missing_go_to_left[nodes], go_left)
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+            if self.is_leaf[nodes].all():
+                break
+
+        raw = self.baseline + self.value[nodes].sum(axis=1)
+        return np.exp(raw) if self.log_link else raw